@@ -0,0 +1,334 @@
+# advisor.py
+import contextvars
+import copy
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from bundles import get_bundle
+from cache import LRUCache
+from color import rgb_to_lab
+from palette import DEFAULT_PALETTE, DEFAULT_SKIN_CATEGORY, DEFAULT_UNDERTONE, skin_anchor, undertone_from_lab
+from tracing import span
+from landmarks import (LEFT_CHEEK, RIGHT_CHEEK, USE_LANDMARKS, LandmarkEngine, landmark_face_shape,
+                       landmark_iris_color, region_mask)
+
+# YCrCb skin bounds used by the skin mask
+SKIN_LOWER = np.array([0, 135, 85], dtype=np.uint8)
+SKIN_UPPER = np.array([255, 180, 135], dtype=np.uint8)
+INTENSITIES = np.arange(256, dtype=np.float64)
+EYE_CASCADE = cv2.data.haarcascades + 'haarcascade_eye.xml'
+
+# Group photos: faces beyond MAX_FACES (the smallest) are ignored, and per-face work shares FACE_WORKERS threads
+MAX_FACES = 8
+FACE_WORKERS = 4
+_face_pool = ThreadPoolExecutor(max_workers=FACE_WORKERS, thread_name_prefix="faces")
+
+# Scratch buffers are reused between calls; one set per thread since the advisor is shared
+_buffers = threading.local()
+
+
+def _thread_eye_cascade():
+    # Face-pool threads each load their own eye cascade once, so per-face eye detection runs without the lock
+    cascade = getattr(_buffers, 'eye_cascade', None)
+    if cascade is None:
+        cascade = _buffers.eye_cascade = cv2.CascadeClassifier(EYE_CASCADE)
+    return cascade
+
+
+def _scratch(name, shape):
+    size = int(np.prod(shape))
+    buffer = getattr(_buffers, name, None)
+    if buffer is None or buffer.size < size:
+        buffer = np.empty(size, dtype=np.uint8)
+        setattr(_buffers, name, buffer)
+    return buffer[:size].reshape(shape)
+
+
+def skin_statistics(face, trim=0.1, max_side=None, roi_mask=None):
+    # Large crops are sampled on a regular pixel grid; the skin colour statistics barely move
+    step = -(-max(face.shape[:2]) // max_side) if max_side else 1
+    if step > 1:
+        grid = face[::step, ::step]
+        face = _scratch('sample', grid.shape)
+        np.copyto(face, grid)
+        if roi_mask is not None:
+            roi_mask = roi_mask[::step, ::step]
+    height, width = face.shape[:2]
+
+    # One colour conversion and one mask, then every statistic comes from per-channel histograms
+    ycrcb = cv2.cvtColor(face, cv2.COLOR_BGR2YCrCb, dst=_scratch('ycrcb', (height, width, 3)))
+    mask = cv2.inRange(ycrcb, SKIN_LOWER, SKIN_UPPER, dst=_scratch('mask', (height, width)))
+    if roi_mask is not None:
+        cv2.bitwise_and(mask, np.ascontiguousarray(roi_mask), dst=mask)
+    count = cv2.countNonZero(mask)
+    if count == 0:
+        return None
+
+    # Histograms are computed in BGR order and flipped so every statistic is RGB
+    histograms = np.stack([cv2.calcHist([face], [channel], mask, [256], [0, 256]).ravel()
+                           for channel in (2, 1, 0)])
+    cumulative = np.cumsum(histograms, axis=1)
+
+    # Trimmed mean: drop the darkest and brightest `trim` fraction of skin pixels per channel
+    low, high = count * trim, count * (1 - trim)
+    weights = np.clip(np.minimum(cumulative, high) - np.maximum(cumulative - histograms, low), 0, None)
+
+    return {
+        "count": count,
+        "histograms": histograms,
+        "mean": tuple(histograms @ INTENSITIES / count),
+        "median": tuple(int(v) for v in np.argmax(cumulative >= count / 2, axis=1)),
+        "trimmed_mean": tuple(weights @ INTENSITIES / weights.sum(axis=1)),
+    }
+
+
+class ComprehensiveMakeupAdvisor:
+    def __init__(self, scale_factor=1.3, min_neighbors=5, detect_size=640, skin_sample_size=256,
+                 use_landmarks=USE_LANDMARKS, cache_size=64, cache_ttl=3600):
+        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        self.eye_cascade = cv2.CascadeClassifier(EYE_CASCADE)
+        # The advisor is shared by every session, so cascade calls are serialized
+        self._lock = threading.Lock()
+        self.warm_up_seconds = None
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        # Longest side of the detection thumbnail; None detects on the full-resolution image
+        self.detect_size = detect_size
+        # Longest side of the face crop used for skin statistics; None uses every pixel
+        self.skin_sample_size = skin_sample_size
+        # With landmarks enabled and a model installed, one landmark pass drives face shape, iris colour and
+        # the skin region; otherwise the box-ratio and eye-cascade heuristics are used
+        self.landmarks = LandmarkEngine() if use_landmarks else None
+        if self.landmarks is not None and not self.landmarks.available:
+            self.landmarks = None
+        self.palette = DEFAULT_PALETTE
+        # Reruns keep re-submitting the same photo, so results are memoized by pixel hash
+        self.results_cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def warm_up(self):
+        # Run both cascades once so the first real request doesn't pay their setup cost
+        start = time.perf_counter()
+        blank = np.zeros((64, 64), dtype=np.uint8)
+        with self._lock:
+            self.face_cascade.detectMultiScale(blank, self.scale_factor, self.min_neighbors)
+            self.eye_cascade.detectMultiScale(blank)
+        self.warm_up_seconds = time.perf_counter() - start
+
+    def image_key(self, pixels):
+        # Hashed in place through the buffer protocol; `pixels` is C-contiguous, so nothing is copied
+        digest = hashlib.blake2b(memoryview(pixels), digest_size=16)
+        digest.update(f"{pixels.shape}|{pixels.dtype}|{self.scale_factor}|{self.min_neighbors}|{self.detect_size}|{self.skin_sample_size}|{self.landmarks is not None}".encode())
+        return digest.hexdigest()
+
+    def analyze_image(self, image, all_faces=False):
+        # With all_faces, returns a list of results (each with its "box") instead of the largest face's
+        with span("analysis.cache_lookup"):
+            pixels = np.ascontiguousarray(image)
+            key = self.image_key(pixels) + (":all" if all_faces else "")
+            cached = self.results_cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        result = self.analyze_all_pixels(pixels) if all_faces else self.analyze_pixels(pixels)
+        self.results_cache.set(key, copy.deepcopy(result))
+        return result
+
+    def detect_faces(self, gray):
+        with span("analysis.detect_faces"):
+            return self._detect_faces(gray)
+
+    def _detect_faces(self, gray):
+        height, width = gray.shape[:2]
+        if not self.detect_size or max(height, width) <= self.detect_size:
+            with self._lock:
+                return self.face_cascade.detectMultiScale(gray, self.scale_factor, self.min_neighbors)
+
+        # Detect on a bounded-size thumbnail, then map each box back to full resolution
+        scale = self.detect_size / max(height, width)
+        thumbnail = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        with self._lock:
+            faces = self.face_cascade.detectMultiScale(thumbnail, self.scale_factor, self.min_neighbors)
+        return [self.refine_face(gray, [int(round(v / scale)) for v in box]) for box in faces]
+
+    def refine_face(self, gray, box, margin=0.2):
+        # Re-detect inside a padded window around the mapped box, restricted to sizes close to it
+        x, y, w, h = box
+        pad_x, pad_y = int(w * margin), int(h * margin)
+        x0, y0 = max(x - pad_x, 0), max(y - pad_y, 0)
+        x1, y1 = min(x + w + pad_x, gray.shape[1]), min(y + h + pad_y, gray.shape[0])
+        with self._lock:
+            faces = self.face_cascade.detectMultiScale(
+                gray[y0:y1, x0:x1], 1.1, self.min_neighbors,
+                minSize=(int(w * 0.8), int(h * 0.8)), maxSize=(int(w * 1.25), int(h * 1.25)))
+        if len(faces) == 0:
+            return x, y, w, h
+        fx, fy, fw, fh = max(faces, key=lambda f: f[2] * f[3])
+        return x0 + fx, y0 + fy, fw, fh
+
+    def analyze_pixels(self, pixels):
+        with span("analysis.color_conversion"):
+            gray = cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+
+        # Detect face
+        faces = self.detect_faces(gray)
+
+        if len(faces) == 0:
+            return None, "No face detected"
+
+        # Analyze the largest face; only its region is converted to cv2's BGR order
+        x, y, w, h = max(faces, key=lambda x: x[2] * x[3])
+        with span("analysis.color_conversion"):
+            face = cv2.cvtColor(pixels[y:y + h, x:x + w], cv2.COLOR_RGB2BGR)
+
+        points = None
+        if self.landmarks is not None:
+            with span("analysis.landmarks"):
+                points = self.landmarks.fit(gray, (x, y, w, h))
+        return self.analyze_face(gray, face, (x, y, w, h), points), "Success"
+
+    def analyze_all_pixels(self, pixels, max_faces=MAX_FACES):
+        # Every detected face, left to right: detection, colour conversion and landmarks run once for the
+        # whole image, then the per-face skin and eye work is spread over a small thread pool
+        with span("analysis.color_conversion"):
+            gray = cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+        faces = self.detect_faces(gray)
+        if len(faces) == 0:
+            return [], "No face detected"
+
+        boxes = sorted((tuple(int(v) for v in box) for box in faces), key=lambda b: b[2] * b[3], reverse=True)
+        boxes = sorted(boxes[:max_faces], key=lambda b: b[0])
+        with span("analysis.color_conversion"):
+            bgr = cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR)
+        points = [None] * len(boxes)
+        if self.landmarks is not None:
+            with span("analysis.landmarks", faces=len(boxes)):
+                points = self.landmarks.fit_all(gray, boxes)
+
+        def analyze(box, face_points, own_cascade):
+            x, y, w, h = box
+            eye_cascade = _thread_eye_cascade() if own_cascade else None
+            return dict(self.analyze_face(gray, bgr[y:y + h, x:x + w], box, face_points, eye_cascade), box=box)
+
+        if len(boxes) == 1:
+            return [analyze(boxes[0], points[0], False)], "Success"
+        # Each pool task runs in a copy of this context so its spans land in the current trace
+        futures = [_face_pool.submit(contextvars.copy_context().run, analyze, box, face_points, True)
+                   for box, face_points in zip(boxes, points)]
+        return [future.result() for future in futures], "Success"
+
+    def analyze_face(self, gray, face, box, points=None, eye_cascade=None):
+        # `face` is the box's region in BGR order; `points` are its landmarks when a model is loaded
+        x, y, w, h = box
+        if points is not None:
+            cheeks = region_mask(face.shape, points, [RIGHT_CHEEK, LEFT_CHEEK], offset=(x, y))
+            skin_tone, skin_info = self.analyze_skin_tone(face, cheeks)
+            if skin_tone is None:
+                skin_tone, skin_info = self.analyze_skin_tone(face)
+            return {
+                "skin_tone": skin_tone,
+                "skin_category": skin_info[0],
+                "undertone": skin_info[1],
+                "face_shape": landmark_face_shape(points),
+                "eye_color": landmark_iris_color(face, points, offset=(x, y))
+            }
+
+        # Skin tone analysis
+        skin_tone, skin_info = self.analyze_skin_tone(face)
+
+        # Face shape analysis
+        face_shape = self.analyze_face_shape(w, h)
+
+        # Eye color analysis
+        eye_color = self.analyze_eye_color(gray[y:y + h, x:x + w], face, eye_cascade)
+
+        return {
+            "skin_tone": skin_tone,
+            "skin_category": skin_info[0],
+            "undertone": skin_info[1],
+            "face_shape": face_shape,
+            "eye_color": eye_color
+        }
+
+    def analyze_skin_tone(self, face, roi_mask=None):
+        with span("analysis.skin_tone"):
+            stats = skin_statistics(face, max_side=self.skin_sample_size, roi_mask=roi_mask)
+        if stats is None:
+            return None, (None, None)
+
+        # The trimmed mean ignores shadows, highlights and stray non-skin pixels that pass the mask
+        rgb_skin_tone = tuple(int(round(c)) for c in stats["trimmed_mean"])
+        category = self.determine_skin_category(rgb_skin_tone)
+        undertone = self.determine_undertone(rgb_skin_tone)
+        return rgb_skin_tone, (category, undertone)
+
+    def determine_skin_category(self, rgb_color):
+        luminance = 0.299 * rgb_color[0] + 0.587 * rgb_color[1] + 0.114 * rgb_color[2]
+        categories = [
+            (200, 'very_light'), (180, 'light'), (160, 'light_medium'),
+            (140, 'medium'), (120, 'medium_deep'), (100, 'deep'), (0, 'very_deep')
+        ]
+        for threshold, category in categories:
+            if luminance > threshold:
+                return category
+        return 'very_deep'
+
+    def determine_undertone(self, rgb_color):
+        return undertone_from_lab(rgb_to_lab(rgb_color))
+
+    def analyze_face_shape(self, width, height):
+        face_ratio = width / height
+        if face_ratio > 0.95:
+            return "Round"
+        elif face_ratio < 0.85:
+            return "Oval"
+        return "Square"
+
+    def analyze_eye_color(self, gray_face, color_face, eye_cascade=None):
+        # A cascade owned by the calling thread needs no lock; the shared one is serialized
+        with span("analysis.eye_color"):
+            if eye_cascade is not None:
+                eyes = eye_cascade.detectMultiScale(gray_face)
+            else:
+                with self._lock:
+                    eyes = self.eye_cascade.detectMultiScale(gray_face)
+        if len(eyes) > 0:
+            ex, ey, ew, eh = eyes[0]
+            eye = color_face[ey:ey + eh, ex:ex + ew]
+            average_color = np.mean(eye, axis=(0, 1))
+            _, g, r = average_color
+            return "Brown" if r > g else "Blue/Green"
+        return "Unable to detect"
+
+    def suggest_makeup_colors(self, analysis_result, k=3):
+        # The k closest palette colours per category to the measured skin tone, by ΔE in CIELAB
+        if analysis_result.get('skin_tone') is None and k == 3 and self.palette is DEFAULT_PALETTE:
+            # Unmeasured results only depend on their category and undertone, which the bundle covers
+            bundle = get_bundle()
+            colors = bundle.makeup_colors(analysis_result['skin_category'] or DEFAULT_SKIN_CATEGORY,
+                                          analysis_result['undertone'] or DEFAULT_UNDERTONE) \
+                if bundle is not None else None
+            if colors is not None:
+                return colors
+        return self.palette.suggest(self.result_lab(analysis_result), k)
+
+    def suggest_makeup_colors_batch(self, analysis_results, k=3):
+        # Same as suggest_makeup_colors for many results, with a single distance computation
+        if not analysis_results:
+            return []
+        labs = np.empty((len(analysis_results), 3))
+        measured = [i for i, result in enumerate(analysis_results) if result.get('skin_tone') is not None]
+        if measured:
+            labs[measured] = rgb_to_lab([analysis_results[i]['skin_tone'] for i in measured])
+        for i in set(range(len(analysis_results))) - set(measured):
+            labs[i] = self.result_lab(analysis_results[i])
+        return self.palette.suggest(labs, k)
+
+    def result_lab(self, analysis_result):
+        # Results without a measured colour fall back to the anchor for their skin category and undertone
+        if analysis_result.get('skin_tone') is not None:
+            return rgb_to_lab(analysis_result['skin_tone'])
+        return skin_anchor(analysis_result['skin_category'] or DEFAULT_SKIN_CATEGORY,
+                           analysis_result['undertone'] or DEFAULT_UNDERTONE)
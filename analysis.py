@@ -1,63 +1,133 @@
-
+import argparse
 import re
-from openai import OpenAI
-import os
-from PIL import Image, ImageDraw
+from functools import lru_cache
+from PIL import Image, ImageColor, ImageDraw
 import io
-from dotenv import load_dotenv
-import os
+from bundles import get_bundle
+from cache import DiskCache, cache_key
+from clients import call_endpoint, get_openai_client
+from tracing import span
+
+SEASONAL_MODEL = "gpt-4"
+SEASONAL_PARAMS = {"temperature": 1, "max_tokens": 300}
+SEASONAL_SYSTEM_PROMPT = '''
+    You are a skin expert, you will be given an undertone of a skin such as cool, neutral and warm undertone.
+    Seasonal palette consists of Spring, Autumn, Summer and Winter.
+    Suggest a few seasonal palettes that suit the undertone and briefly describe the seasonal palette.'''
+
+# Several cached answers per undertone keep the text varied; they expire after a week
+SEASONAL_VARIANTS = 3
+SEASONAL_CACHE_TTL = 7 * 24 * 3600
+UNDERTONES = ("warm", "cool", "neutral")
+
+seasonal_palettes = {
+    "spring": ["#F8E0E0", "#FA8072", "#FFE4C4", "#FFFFE0"],
+    "summer": ["#E0FFFF", "#AFEEEE", "#ADD8E6", "#87CEEB"],
+    "autumn": ["#F0E68C", "#FFA07A", "#CD853F", "#A0522D"],
+    "winter": ["#FFFFFF", "#DCDCDC", "#A9A9A9", "#696969"]
+}
+
+_seasonal_cache = None
 
-load_dotenv()
-api_key = os.getenv('OPENAI_API_KEY')
-client = OpenAI(api_key=api_key)
 
-def create_color_image(colors, width=400, height=100):
-    image = Image.new("RGB", (width, height))
+def get_seasonal_cache():
+    global _seasonal_cache
+    if _seasonal_cache is None:
+        _seasonal_cache = DiskCache("seasonal_palette", ttl=SEASONAL_CACHE_TTL)
+    return _seasonal_cache
+
+
+def create_color_image(colors, width=400, height=100, format='PNG'):
+    # Swatches are pure functions of their inputs, so each one is rendered and encoded only once
+    return render_color_image(tuple(colors), width, height, format)
+
+
+@lru_cache(maxsize=256)
+def render_color_image(colors, width, height, format):
+    # Palette-mode image: one index per swatch colour keeps the encoded bytes small
+    image = Image.new("P", (width, height))
+    image.putpalette([channel for color in colors for channel in ImageColor.getrgb(color)])
     draw = ImageDraw.Draw(image)
 
     for i, color in enumerate(colors):
-        draw.rectangle([i * (width // len(colors)), 0, (i + 1) * (width // len(colors)), height], fill=color)
+        draw.rectangle([i * (width // len(colors)), 0, (i + 1) * (width // len(colors)), height], fill=i)
 
     img_byte_arr = io.BytesIO()
-    image.save(img_byte_arr, format='PNG')
-    img_byte_arr = img_byte_arr.getvalue()
+    if format == 'WEBP':
+        image.convert("RGB").save(img_byte_arr, format='WEBP', lossless=True)
+    else:
+        image.save(img_byte_arr, format=format, optimize=True)
+    return img_byte_arr.getvalue()
 
-    return img_byte_arr
 
-def get_seasonal_palette(prompt):
-    system_prompt = '''
-    You are a skin expert, you will be given an undertone of a skin such as cool, neutral and warm undertone.
-    Seasonal palette consists of Spring, Autumn, Summer and Winter.
-    Suggest a few seasonal palettes that suit the undertone and briefly describe the seasonal palette.'''
+def rgb_to_hex(rgb):
+    return '#{:02x}{:02x}{:02x}'.format(int(rgb[0]), int(rgb[1]), int(rgb[2]))
 
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=1,
-        max_tokens=300,
-    )
+
+@lru_cache(maxsize=1024)
+def swatch_html(hex_color, size=50):
+    return f"<div style='background-color:{hex_color}; width:{size}px; height:{size}px;'></div>"
+
+
+@lru_cache(maxsize=1024)
+def labelled_swatch_html(color):
+    hex_color = rgb_to_hex(color)
+    return f"""
+    <div style="text-align: center;">
+        <div style="background-color: {hex_color}; width: 50px; height: 50px; margin: 0 auto; border: 1px solid black;"></div>
+        <p style="margin: 5px 0;">RGB: {color}</p>
+        <p style="margin: 0;">HEX: {hex_color}</p>
+    </div>
+    """
+
+
+def seasonal_key(prompt):
+    return cache_key(prompt=prompt, system=SEASONAL_SYSTEM_PROMPT, model=SEASONAL_MODEL, **SEASONAL_PARAMS)
+
+
+def generate_seasonal_analysis(prompt):
+    with span("openai.seasonal_palette", undertone=prompt):
+        response = call_endpoint("openai.chat", lambda: get_openai_client().chat.completions.create(
+            model=SEASONAL_MODEL,
+            messages=[
+                {"role": "system", "content": SEASONAL_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            **SEASONAL_PARAMS,
+        ))
     seasonal_analysis = response.choices[0].message.content
     seasonal_analysis_lower = seasonal_analysis.lower()
-    palette_names = list(set(re.findall(r'(spring|summer|autumn|winter)', seasonal_analysis_lower)))
+    palette_names = sorted(set(re.findall(r'(spring|summer|autumn|winter)', seasonal_analysis_lower)))
+    return {"analysis": seasonal_analysis, "palette_names": palette_names}
 
-    seasonal_palettes = {
-        "spring": ["#F8E0E0", "#FA8072", "#FFE4C4", "#FFFFE0"],
-        "summer": ["#E0FFFF", "#AFEEEE", "#ADD8E6", "#87CEEB"],
-        "autumn": ["#F0E68C", "#FFA07A", "#CD853F", "#A0522D"],
-        "winter": ["#FFFFFF", "#DCDCDC", "#A9A9A9", "#696969"]
-    }
+
+def get_seasonal_analysis(prompt, variants=SEASONAL_VARIANTS):
+    cache = get_seasonal_cache()
+    key = seasonal_key(prompt)
+    cached = cache.get(key, variants)
+    if cached is not None:
+        return cached
+
+    generated = generate_seasonal_analysis(prompt)
+    cache.add(key, generated, variants)
+    return generated
+
+
+def get_seasonal_palette(prompt):
+    # The precomputed bundle answers without touching the cache database or the network
+    bundle = get_bundle()
+    seasonal = bundle.seasonal(prompt) if bundle is not None else None
+    if seasonal is None:
+        seasonal = get_seasonal_analysis(prompt)
 
     results = {
-        "analysis": seasonal_analysis,
+        "analysis": seasonal["analysis"],
         "palettes": {}
     }
 
-    for palette_name in palette_names:
+    for palette_name in seasonal["palette_names"]:
         colors = seasonal_palettes.get(palette_name, [])
-        palette_image = create_color_image(colors)
+        palette_image = (bundle.swatch(palette_name) if bundle is not None else None) or create_color_image(colors)
         results["palettes"][palette_name] = {
             "colors": colors,
             "image": palette_image
@@ -66,3 +136,18 @@ def get_seasonal_palette(prompt):
     return results
 
 
+def warm_seasonal_cache(undertones=UNDERTONES, variants=SEASONAL_VARIANTS):
+    # Fill every undertone's variant pool offline so the app never waits on GPT-4
+    cache = get_seasonal_cache()
+    for undertone in undertones:
+        key = seasonal_key(undertone)
+        while cache.count(key) < variants:
+            cache.add(key, generate_seasonal_analysis(undertone), variants)
+        print(f"{undertone}: {cache.count(key)} cached variants")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate cached seasonal palette analyses")
+    parser.add_argument("--variants", type=int, default=SEASONAL_VARIANTS)
+    args = parser.parse_args()
+    warm_seasonal_cache(variants=args.variants)
@@ -0,0 +1,187 @@
+# batch.py
+import argparse
+import glob
+import json
+import os
+import time
+from multiprocessing import Pool
+import cv2
+from advisor import ComprehensiveMakeupAdvisor
+from ingest import decode_image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# One advisor per worker process, built by the pool initializer
+_advisor = None
+
+
+def _init_worker(detect_size):
+    global _advisor
+    # The pool already spreads work across cores; keep OpenCV from oversubscribing them
+    cv2.setNumThreads(1)
+    _advisor = ComprehensiveMakeupAdvisor(detect_size=detect_size, cache_size=0)
+
+
+def analyze_path(path):
+    try:
+        pixels = decode_image(path)
+        result, message = _advisor.analyze_pixels(pixels)
+    except Exception as e:
+        return {"path": path, "status": "error", "message": str(e)}
+
+    row = {"path": path, "status": "ok" if result else "no_face", "message": message}
+    if result:
+        row.update(result)
+        row["skin_tone"] = list(result["skin_tone"]) if result["skin_tone"] else None
+    return row
+
+
+def iter_images(source):
+    # A directory is walked lazily; any other file is read as a manifest with one path per line
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(root, name)
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        with open(source) as manifest:
+            for line in manifest:
+                path = line.strip()
+                if path and not path.startswith('#'):
+                    yield path if os.path.isabs(path) else os.path.join(base, path)
+
+
+class JsonlWriter:
+    def __init__(self, path, append):
+        self.file = open(path, 'a' if append else 'w')
+
+    @staticmethod
+    def completed(path):
+        done = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        done.add(json.loads(line)["path"])
+                    except (ValueError, KeyError):
+                        # A partial last line from an interrupted run is simply redone
+                        continue
+        return done
+
+    def write(self, row):
+        self.file.write(json.dumps(row) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    # Parquet files can't be appended to, so output is a directory of part files
+    def __init__(self, path, append, rows_per_part=256):
+        import pyarrow  # noqa: F401  (fail early if the optional dependency is missing)
+        if not append:
+            for part in glob.glob(os.path.join(path, 'part-*.parquet')):
+                os.remove(part)
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.rows_per_part = rows_per_part
+        self.rows = []
+        self.part = len(glob.glob(os.path.join(path, 'part-*.parquet')))
+
+    @staticmethod
+    def schema():
+        # Fixed, so a part whose first (or every) row has no face still carries the analysis columns
+        import pyarrow as pa
+        return pa.schema([
+            ('path', pa.string()),
+            ('status', pa.string()),
+            ('message', pa.string()),
+            ('skin_tone', pa.list_(pa.int64())),
+            ('skin_category', pa.string()),
+            ('undertone', pa.string()),
+            ('face_shape', pa.string()),
+            ('eye_color', pa.string()),
+        ])
+
+    @staticmethod
+    def completed(path):
+        import pyarrow.parquet as pq
+        done = set()
+        for part in glob.glob(os.path.join(path, 'part-*.parquet')):
+            done.update(pq.read_table(part, columns=['path']).column('path').to_pylist())
+        return done
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.rows_per_part:
+            self.flush()
+
+    def flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if not self.rows:
+            return
+        # Write under a temporary name so an interrupted run never leaves a truncated part
+        target = os.path.join(self.path, f'part-{self.part:05d}.parquet')
+        pq.write_table(pa.Table.from_pylist(self.rows, schema=self.schema()), target + '.tmp')
+        os.replace(target + '.tmp', target)
+        self.part += 1
+        self.rows = []
+
+    def close(self):
+        self.flush()
+
+
+def open_writer(output, append):
+    if output.endswith('.parquet'):
+        return ParquetWriter(output, append)
+    return JsonlWriter(output, append)
+
+
+def run_batch(source, output, workers=None, detect_size=640, resume=True, chunksize=4, progress=None):
+    writer_class = ParquetWriter if output.endswith('.parquet') else JsonlWriter
+    done = writer_class.completed(output) if resume else set()
+    pending = (path for path in iter_images(source) if path not in done)
+
+    stats = {"skipped": len(done), "ok": 0, "no_face": 0, "error": 0}
+    writer = open_writer(output, append=resume)
+    try:
+        with Pool(workers or os.cpu_count(), initializer=_init_worker, initargs=(detect_size,)) as pool:
+            for row in pool.imap_unordered(analyze_path, pending, chunksize):
+                writer.write(row)
+                stats[row["status"]] += 1
+                if progress:
+                    progress(stats)
+    finally:
+        writer.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze a directory or manifest of face images")
+    parser.add_argument("source", help="image directory, or a text file with one image path per line")
+    parser.add_argument("output", help="results file: .jsonl, or .parquet (a directory of part files)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--detect-size", type=int, default=640, help="detection thumbnail size, 0 for full resolution")
+    parser.add_argument("--no-resume", action="store_true", help="start over instead of skipping finished images")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    def progress(stats):
+        processed = stats["ok"] + stats["no_face"] + stats["error"]
+        if processed % 100 == 0:
+            print(f"{processed} images, {processed / (time.perf_counter() - start):.1f}/s", flush=True)
+
+    stats = run_batch(args.source, args.output, workers=args.workers, detect_size=args.detect_size or None,
+                      resume=not args.no_resume, progress=progress)
+    elapsed = time.perf_counter() - start
+    print(f"Done in {elapsed:.1f}s: {stats['ok']} analyzed, {stats['no_face']} without a face, "
+          f"{stats['error']} errors, {stats['skipped']} already done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,534 @@
+# benchmark.py
+import argparse
+import glob
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Benchmarks never read or write the app's own caches
+os.environ.setdefault("GLOSSIERE_CACHE_DIR", tempfile.mkdtemp(prefix="glossiere-bench-"))
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+from advisor import ComprehensiveMakeupAdvisor, skin_statistics
+from analysis import create_color_image, render_color_image, seasonal_palettes
+from catalog import ProductCatalog
+from landmarks import (LEFT_CHEEK, RIGHT_CHEEK, LandmarkEngine, face_proportions, landmark_face_shape,
+                       landmark_iris_color, region_mask)
+from shop import filter_shades
+from stubs import StubUpstreams
+from tracing import finish_trace, start_trace
+
+SAMPLE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(SAMPLE_DIR, "benchmarks")
+HEAVY_MODULES = ("cv2", "numpy", "PIL.Image", "openai", "googleapiclient.discovery", "httplib2", "requests")
+
+# Run in a fresh interpreter each time, so nothing is already imported or cached
+IMPORT_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import main
+print(json.dumps({"seconds": time.perf_counter() - start, "loaded": [m for m in %r if m in sys.modules]}))
+''' % (HEAVY_MODULES,)
+FIRST_RUN_PROBE = '''
+import json, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("main.py", default_timeout=120)
+start = time.perf_counter()
+app.run()
+print(json.dumps({"seconds": time.perf_counter() - start, "exception": bool(app.exception)}))
+'''
+
+
+def load_samples(megapixels=None):
+    samples = []
+    for path in sorted(glob.glob(os.path.join(SAMPLE_DIR, "*.jpg"))):
+        pixels = np.asarray(Image.open(path).convert("RGB"))
+        if megapixels:
+            # Upscale the bundled photos to phone-camera resolution
+            scale = (megapixels * 1e6 / (pixels.shape[0] * pixels.shape[1])) ** 0.5
+            pixels = cv2.resize(pixels, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        samples.append((os.path.basename(path), np.ascontiguousarray(pixels)))
+    return samples
+
+
+def timed(fn, *args, repeat=3):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def largest_box(faces):
+    if len(faces) == 0:
+        return None
+    return tuple(int(v) for v in max(faces, key=lambda f: f[2] * f[3]))
+
+
+def box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+def bench_detection(args):
+    full = ComprehensiveMakeupAdvisor(detect_size=None)
+    multi = ComprehensiveMakeupAdvisor(detect_size=args.detect_size)
+    failures = 0
+
+    print(f"{'image':<20} {'size':>11} {'full ms':>9} {'multi ms':>9} {'iou':>6}  analysis")
+    for name, pixels in load_samples(args.megapixels):
+        gray = cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+        full_time, full_faces = timed(full.detect_faces, gray)
+        multi_time, multi_faces = timed(multi.detect_faces, gray)
+        full_box, multi_box = largest_box(full_faces), largest_box(multi_faces)
+
+        if full_box is None and multi_box is None:
+            iou, verdict = None, "no face (both)"
+        elif full_box is None or multi_box is None:
+            iou, verdict = 0.0, "MISMATCH: face found by one path only"
+        else:
+            iou = box_iou(full_box, multi_box)
+            full_result, _ = full.analyze_pixels(pixels)
+            multi_result, _ = multi.analyze_pixels(pixels)
+            same = all(full_result[k] == multi_result[k]
+                       for k in ("skin_category", "undertone", "face_shape", "eye_color"))
+            verdict = "agree" if same and iou >= args.min_iou else "MISMATCH"
+
+        failures += verdict.startswith("MISMATCH")
+        size = f"{pixels.shape[1]}x{pixels.shape[0]}"
+        iou_text = "-" if iou is None else f"{iou:.2f}"
+        print(f"{name:<20} {size:>11} {full_time * 1000:9.1f} {multi_time * 1000:9.1f} {iou_text:>6}  {verdict}")
+
+    return 1 if failures else 0
+
+
+def legacy_skin_tone(face):
+    # The original mask-then-mean implementation of analyze_skin_tone
+    ycrcb_image = cv2.cvtColor(face, cv2.COLOR_BGR2YCrCb)
+    skin_mask = cv2.inRange(ycrcb_image, np.array([0, 135, 85]), np.array([255, 180, 135]))
+    skin = cv2.bitwise_and(face, face, mask=skin_mask)
+    if np.sum(skin_mask) > 0:
+        return tuple(reversed(cv2.mean(skin, mask=skin_mask)[:3]))
+    return None
+
+
+def bench_skin(args):
+    # "max diff" compares the sampled mean against the legacy full-resolution mean, per RGB channel
+    advisor = ComprehensiveMakeupAdvisor()
+    print(f"{'image':<20} {'face':>11} {'legacy ms':>10} {'single ms':>10} {'sampled ms':>11} {'max diff':>9}")
+    for name, pixels in load_samples(args.megapixels):
+        faces = advisor.detect_faces(cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY))
+        box = largest_box(faces)
+        if box is None:
+            continue
+        x, y, w, h = box
+        face = cv2.cvtColor(pixels[y:y + h, x:x + w], cv2.COLOR_RGB2BGR)
+
+        legacy_time, legacy_mean = timed(legacy_skin_tone, face, repeat=args.repeat)
+        single_time, _ = timed(skin_statistics, face, 0.1, None, repeat=args.repeat)
+        sampled_time, stats = timed(skin_statistics, face, 0.1, advisor.skin_sample_size, repeat=args.repeat)
+        diff = max(abs(a - b) for a, b in zip(legacy_mean, stats["mean"]))
+        print(f"{name:<20} {f'{w}x{h}':>11} {legacy_time * 1000:10.2f} {single_time * 1000:10.2f} "
+              f"{sampled_time * 1000:11.2f} {diff:9.2f}")
+    return 0
+
+
+def legacy_color_image(colors, width=400, height=100):
+    # The original per-request RGB render and PNG encode
+    image = Image.new("RGB", (width, height))
+    draw = ImageDraw.Draw(image)
+    for i, color in enumerate(colors):
+        draw.rectangle([i * (width // len(colors)), 0, (i + 1) * (width // len(colors)), height], fill=color)
+    img_byte_arr = io.BytesIO()
+    image.save(img_byte_arr, format='PNG')
+    return img_byte_arr.getvalue()
+
+
+def bench_swatch(args):
+    render_color_image.cache_clear()
+    print(f"{'palette':<8} {'legacy us':>10} {'cached us':>10} {'rgb png B':>10} {'p png B':>8} {'webp B':>7}")
+    for name, colors in seasonal_palettes.items():
+        legacy_time, legacy_bytes = timed(legacy_color_image, colors, repeat=args.repeat)
+        create_color_image(colors)
+        cached_time, png_bytes = timed(create_color_image, colors, repeat=args.repeat)
+        webp_bytes = create_color_image(colors, format='WEBP')
+        print(f"{name:<8} {legacy_time * 1e6:10.1f} {cached_time * 1e6:10.2f} "
+              f"{len(legacy_bytes):10d} {len(png_bytes):8d} {len(webp_bytes):7d}")
+    return 0
+
+
+def bench_landmarks(args):
+    engine = LandmarkEngine(args.model) if args.model else LandmarkEngine()
+    if not engine.available:
+        print("Landmark model unavailable: pip install -r models/requirements.txt, then python models/fetch_models.py "
+              "(or point LANDMARK_MODEL at lbfmodel.yaml)")
+        return 0
+    advisor = ComprehensiveMakeupAdvisor(use_landmarks=False)
+
+    def cascade_path(gray, face, box):
+        x, y, w, h = box
+        return (advisor.analyze_skin_tone(face)[1][0], advisor.analyze_face_shape(w, h),
+                advisor.analyze_eye_color(gray[y:y + h, x:x + w], face))
+
+    def landmark_path(gray, face, box):
+        x, y, w, h = box
+        points = engine.fit(gray, box)
+        if points is None:
+            return None
+        cheeks = region_mask(face.shape, points, [RIGHT_CHEEK, LEFT_CHEEK], offset=(x, y))
+        return (advisor.analyze_skin_tone(face, cheeks)[1][0], landmark_face_shape(points),
+                landmark_iris_color(face, points, offset=(x, y)), face_proportions(points))
+
+    # The width and jaw ratios are printed so OVAL_MAX_WIDTH_RATIO / SQUARE_MIN_JAW_RATIO can be rechecked
+    print(f"{'image':<20} {'cascade ms':>11} {'landmark ms':>12} {'width':>6} {'jaw':>6}  "
+          f"cascade / landmark result")
+    for name, pixels in load_samples(args.megapixels):
+        gray = cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+        box = largest_box(advisor.detect_faces(gray))
+        if box is None:
+            continue
+        x, y, w, h = box
+        face = cv2.cvtColor(pixels[y:y + h, x:x + w], cv2.COLOR_RGB2BGR)
+        cascade_time, cascade_result = timed(cascade_path, gray, face, box, repeat=args.repeat)
+        landmark_time, landmark_result = timed(landmark_path, gray, face, box, repeat=args.repeat)
+        width_ratio, jaw_ratio = landmark_result[3] if landmark_result else (float('nan'), float('nan'))
+        print(f"{name:<20} {cascade_time * 1000:11.2f} {landmark_time * 1000:12.2f} {width_ratio:6.3f} "
+              f"{jaw_ratio:6.3f}  {cascade_result} / {landmark_result and landmark_result[:3]}")
+    return 0
+
+
+def probe(code):
+    # Streamlit is imported before the timer in a real server process too, so it isn't counted
+    result = subprocess.run([sys.executable, "-c", "import streamlit\n" + code], cwd=SAMPLE_DIR,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench_startup(args):
+    # What a new server worker pays before its first page: importing main.py, then the first script run
+    imports = [probe(IMPORT_PROBE) for _ in range(args.repeat)]
+    first_runs = [probe(FIRST_RUN_PROBE) for _ in range(args.repeat)]
+    import_ms = sorted(r["seconds"] * 1000 for r in imports)
+    run_ms = sorted(r["seconds"] * 1000 for r in first_runs)
+    print(f"import main:      median {import_ms[len(import_ms) // 2]:7.1f} ms  (min {import_ms[0]:.1f})")
+    print(f"  loaded at import: {', '.join(imports[-1]['loaded']) or 'none of ' + ', '.join(HEAVY_MODULES)}")
+    print(f"first script run: median {run_ms[len(run_ms) // 2]:7.1f} ms  (min {run_ms[0]:.1f})"
+          + ("  [raised]" if any(r["exception"] for r in first_runs) else ""))
+    return 0
+
+
+def measure(fn, iterations, warmup=1, items=1):
+    # `fn` may return {stage: seconds}; each stage gets its own percentiles next to the total
+    for _ in range(warmup):
+        fn()
+    totals, stages = [], {}
+    for _ in range(iterations):
+        start = time.perf_counter()
+        parts = fn() or {}
+        totals.append(time.perf_counter() - start)
+        for stage, seconds in parts.items():
+            stages.setdefault(stage, []).append(seconds)
+
+    # One more pass under tracemalloc for peak Python and numpy allocations, kept out of the timings
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    results = {"": summarize(totals, items, peak)}
+    results.update({f"/{stage}": summarize(times) for stage, times in stages.items()})
+    return results
+
+
+def summarize(times, items=1, peak=None):
+    ms = np.array(times) * 1000
+    summary = {"n": len(times), "p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+               "p99_ms": float(np.percentile(ms, 99)), "mean_ms": float(ms.mean()),
+               "per_second": len(times) * items / max(sum(times), 1e-9)}
+    if peak is not None:
+        summary["peak_kib"] = peak / 1024
+    return summary
+
+
+def suite_analyze(args):
+    advisor = ComprehensiveMakeupAdvisor()
+    images = [Image.open(path) for path in sorted(glob.glob(os.path.join(SAMPLE_DIR, "*.jpg")))]
+    for image in images:
+        image.load()
+    position = 0
+
+    def analyze():
+        nonlocal position
+        image = images[position % len(images)]
+        position += 1
+        advisor.results_cache.clear()
+        trace = start_trace("benchmark")
+        advisor.analyze_image(image)
+        finish_trace(trace)
+        stages = {}
+        for s in trace.spans:
+            stages[s["name"]] = stages.get(s["name"], 0) + s["duration_ms"] / 1000
+        return stages
+
+    return measure(analyze, args.iterations)
+
+
+def suite_color_image(args):
+    colors = seasonal_palettes["autumn"]
+
+    def cold():
+        render_color_image.cache_clear()
+        create_color_image(colors)
+
+    def warm():
+        create_color_image(colors)
+
+    return {"/cold": measure(cold, args.iterations * 10)[""], "/warm": measure(warm, args.iterations * 10)[""]}
+
+
+def suite_filter_shades(args, catalog):
+    products = list(catalog.products.values())
+    skin_tone = (198, 156, 128)
+
+    def filter_all():
+        for product in products:
+            filter_shades(product, "medium", "warm", skin_tone)
+
+    return measure(filter_all, args.iterations, items=len(products))
+
+
+def suite_palette(args):
+    advisor = ComprehensiveMakeupAdvisor(use_landmarks=False)
+    rng = np.random.default_rng(0)
+    results = [{"skin_tone": tuple(int(v) for v in rgb), "skin_category": None, "undertone": None}
+               for rgb in rng.integers(60, 255, size=(1000, 3))]
+
+    def single():
+        advisor.suggest_makeup_colors(results[0])
+
+    def batch():
+        advisor.suggest_makeup_colors_batch(results)
+
+    return {"/single": measure(single, args.iterations * 10)[""],
+            "/batch": measure(batch, args.iterations, items=len(results))[""]}
+
+
+def render_tabs_script(image_path):
+    # Runs inside AppTest as its own Streamlit script
+    import streamlit as st
+    from ingest import decode_image
+    from main import get_advisor, show_results
+    from pipeline import Pipeline
+    advisor = get_advisor()
+    pipeline = Pipeline(st.session_state)
+    pixels = pipeline.run("decode", lambda: decode_image(image_path), {"file": image_path})
+    analysis_result, _ = pipeline.run("analysis", lambda: advisor.analyze_image(pixels), {"source": "image"},
+                                      after=("decode",))
+    show_results(advisor, analysis_result, pipeline)
+    st.caption(f"Stages this rerun: {len(pipeline.executed)} executed, {len(pipeline.skipped)} skipped")
+
+
+def suite_tabs(args):
+    from streamlit.testing.v1 import AppTest
+    image_path = os.path.join(SAMPLE_DIR, "bare face 3.jpg")
+
+    def click(app, label):
+        next(button for button in app.button if button.label == label).click()
+        start = time.perf_counter()
+        app.run()
+        return time.perf_counter() - start
+
+    def select(app, label, value):
+        # A widget change on the last tab: every other stage should be skipped
+        next(box for box in app.selectbox if box.label == label).set_value(value)
+        start = time.perf_counter()
+        app.run()
+        return time.perf_counter() - start
+
+    def session():
+        app = AppTest.from_function(render_tabs_script, args=(image_path,), default_timeout=60)
+        start = time.perf_counter()
+        app.run()
+        stages = {"first_render": time.perf_counter() - start,
+                  "tutorial": click(app, "Generate Makeup Tutorial"),
+                  "shop": click(app, "Get Product Recommendations"),
+                  "page": select(app, "Products per page", 5)}
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+        return stages
+
+    return measure(session, max(args.iterations // 4, 3))
+
+
+def print_results(results, baseline=None):
+    print(f"{'case':<40} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10} {'peak KiB':>9}"
+          + ("  vs baseline" if baseline else ""))
+    for case, r in results.items():
+        peak = f"{r['peak_kib']:9.0f}" if "peak_kib" in r else f"{'':>9}"
+        line = (f"{case:<40} {r['n']:5d} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['p99_ms']:9.2f} "
+                f"{r['per_second']:10.1f} {peak}")
+        if baseline and case in baseline:
+            line += f"  {(r['p50_ms'] / baseline[case]['p50_ms'] - 1) * 100:+6.1f}%"
+        print(line)
+
+
+def compare(results, baseline, tolerance, min_ms):
+    # A case regresses when its median (or peak memory) grows by more than `tolerance`; sub-`min_ms`
+    # medians are too noisy to judge
+    regressions = []
+    for case, old in baseline.items():
+        new = results.get(case)
+        if new is None:
+            continue
+        if old["p50_ms"] >= min_ms and new["p50_ms"] > old["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{case}: p50 {old['p50_ms']:.2f} -> {new['p50_ms']:.2f} ms")
+        if "peak_kib" in old and new.get("peak_kib", 0) > old["peak_kib"] * (1 + tolerance) + 64:
+            regressions.append(f"{case}: peak {old['peak_kib']:.0f} -> {new['peak_kib']:.0f} KiB")
+    return regressions
+
+
+def baseline_path(name):
+    return name if name.endswith(".json") else os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def environment():
+    return {"python": platform.python_version(), "machine": platform.machine(), "system": platform.system(),
+            "cpus": os.cpu_count(), "numpy": np.__version__, "opencv": cv2.__version__}
+
+
+def bench_suite(args):
+    with StubUpstreams(latency=args.upstream_latency / 1000, products=args.products) as stub:
+        os.environ.update(stub.env())
+        # Saved where get_catalog() looks, so the app loads this catalog instead of syncing the real one
+        catalog = ProductCatalog()
+        catalog.sync(stub.env()["MAKEUP_API_URL"])
+
+        cases = {"analyze_image": lambda: suite_analyze(args),
+                 "create_color_image": lambda: suite_color_image(args),
+                 "filter_shades": lambda: suite_filter_shades(args, catalog),
+                 "suggest_makeup_colors": lambda: suite_palette(args),
+                 "tabs": lambda: suite_tabs(args)}
+        results = {}
+        for name, run in cases.items():
+            if args.only and name not in args.only:
+                continue
+            for suffix, summary in run().items():
+                results[name + suffix] = summary
+        upstream_calls = dict(stub.requests)
+
+    baseline = None
+    if args.compare:
+        with open(baseline_path(args.compare)) as f:
+            saved = json.load(f)
+        baseline = saved["results"]
+        if saved["environment"] != environment():
+            print(f"warning: baseline was recorded on {saved['environment']}", file=sys.stderr)
+
+    print_results(results, baseline)
+    print(f"upstream calls: {upstream_calls}; "
+          f"max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+    if args.save:
+        path = baseline_path(args.save)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"environment": environment(), "upstream_latency_ms": args.upstream_latency,
+                       "results": results}, f, indent=2)
+        print(f"baseline saved to {path}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance, args.min_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+def bench_faces(args):
+    # A synthetic group photo of up to N bundled faces side by side: one all-faces call vs one upload per face
+    advisor = ComprehensiveMakeupAdvisor()
+    tiles = []
+    for _, pixels in load_samples():
+        if largest_box(advisor.detect_faces(cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY))) is not None:
+            tiles.append(cv2.resize(pixels, (args.tile_width, args.tile_width * 5 // 4), interpolation=cv2.INTER_AREA))
+
+    print(f"{'faces':>5} {'found':>6} {'all-faces ms':>13} {'per-upload ms':>14} {'ratio':>6}")
+    for count in range(1, min(args.max_faces, len(tiles)) + 1):
+        group = np.ascontiguousarray(np.hstack(tiles[:count]))
+        multi_time, (results, _) = timed(advisor.analyze_all_pixels, group, repeat=args.repeat)
+        single_time, _ = timed(advisor.analyze_pixels, group, repeat=args.repeat)
+        uploads = single_time * count
+        print(f"{count:5d} {len(results):6d} {multi_time * 1000:13.1f} {uploads * 1000:14.1f} {multi_time / uploads:6.2f}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Glossiere performance benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    detection = subparsers.add_parser("detection", help="full-resolution vs downscale-then-detect")
+    detection.add_argument("--detect-size", type=int, default=640)
+    detection.add_argument("--megapixels", type=float, default=12.0)
+    detection.add_argument("--min-iou", type=float, default=0.6)
+    detection.set_defaults(func=bench_detection)
+
+    skin = subparsers.add_parser("skin", help="mask-then-mean vs single-pass skin statistics")
+    skin.add_argument("--megapixels", type=float, default=None)
+    skin.add_argument("--repeat", type=int, default=20)
+    skin.set_defaults(func=bench_skin)
+
+    swatch = subparsers.add_parser("swatch", help="per-request vs cached palette swatch images")
+    swatch.add_argument("--repeat", type=int, default=200)
+    swatch.set_defaults(func=bench_swatch)
+
+    landmark = subparsers.add_parser("landmarks", help="eye-cascade heuristics vs one landmark pass")
+    landmark.add_argument("--model", default=None, help="path to lbfmodel.yaml")
+    landmark.add_argument("--megapixels", type=float, default=None)
+    landmark.add_argument("--repeat", type=int, default=5)
+    landmark.set_defaults(func=bench_landmarks)
+
+    faces = subparsers.add_parser("faces", help="analyzing every face of a group photo vs one upload per face")
+    faces.add_argument("--max-faces", type=int, default=5)
+    faces.add_argument("--tile-width", type=int, default=800)
+    faces.add_argument("--repeat", type=int, default=3)
+    faces.set_defaults(func=bench_faces)
+
+    startup = subparsers.add_parser("startup", help="cold import time and first script run of main.py")
+    startup.add_argument("--repeat", type=int, default=5)
+    startup.set_defaults(func=bench_startup)
+
+    suite = subparsers.add_parser("suite", help="per-stage latency, throughput and peak memory against local "
+                                                 "stub upstreams, with saved baselines")
+    suite.add_argument("--iterations", type=int, default=20)
+    suite.add_argument("--only", nargs="+", choices=["analyze_image", "create_color_image", "filter_shades",
+                                                     "suggest_makeup_colors", "tabs"])
+    suite.add_argument("--products", type=int, default=1000, help="size of the synthetic catalog")
+    suite.add_argument("--upstream-latency", type=float, default=50, help="stub response delay in ms")
+    suite.add_argument("--save", metavar="NAME", help="save results as a baseline (a name or a .json path)")
+    suite.add_argument("--compare", metavar="NAME", help="compare against a saved baseline; exit 1 on regression")
+    suite.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing (0.25 = 25%%)")
+    suite.add_argument("--min-ms", type=float, default=0.05, help="ignore cases whose baseline median is below this")
+    suite.set_defaults(func=bench_suite)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,275 @@
+# bundles.py
+import argparse
+import json
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from cache import CACHE_DIR, cache_key
+from catalog import CATALOG_MAX_AGE, ShadeIndex
+
+# Every recommendation that depends only on the app's finite inputs, precomputed into one file: a fixed
+# header, a JSON index of {key: [offset, length, kind]} plus build metadata, then the entries themselves
+# (JSON documents, encoded images and raw float32 arrays). Workers map it read-only, so the OS shares one
+# copy of the pages between them and a lookup only touches the pages of the entry it reads.
+BUNDLE_PATH = os.path.join(CACHE_DIR, 'bundles.bin')
+# Bumped whenever the layout below changes; workers ignore a bundle written in another format
+FORMAT_VERSION = 1
+MAGIC = b'GLSBNDL\0'
+# magic, format version, index length in bytes
+HEADER = struct.Struct('<8sII')
+# Entries start on 8-byte boundaries so arrays can be viewed in place
+ALIGNMENT = 8
+
+
+def source_fingerprint():
+    # Everything the bundle is derived from that lives in code; editing any of it invalidates the file
+    from analysis import SEASONAL_MODEL, SEASONAL_PARAMS, SEASONAL_SYSTEM_PROMPT, seasonal_palettes
+    from makeup import LOOK_SIZE, LOOKS, LOOKS_BY_FACE_SHAPE, find_look_image
+    from palette import MAKEUP_CATEGORIES, PALETTE_TABLE, SKIN_CHROMA, SKIN_LIGHTNESS, UNDERTONE_HUES
+    from shop import BRANDS, PRODUCT_TYPES, THUMBNAIL_SIZE
+    # Look photos are data, not code: a replaced photo is caught by its size and modification time
+    photos = {}
+    for _, _, img_path in LOOKS.values():
+        source = find_look_image(img_path)
+        stat = os.stat(source) if source else None
+        photos[img_path] = [stat.st_size, int(stat.st_mtime)] if stat else None
+    return cache_key(format=FORMAT_VERSION, seasonal=[SEASONAL_MODEL, SEASONAL_PARAMS, SEASONAL_SYSTEM_PROMPT,
+                                                      seasonal_palettes],
+                     looks=[dict(LOOKS), {shape: [look[0] for look in looks]
+                                          for shape, looks in LOOKS_BY_FACE_SHAPE.items()}, LOOK_SIZE, photos],
+                     palette=[MAKEUP_CATEGORIES, PALETTE_TABLE, SKIN_LIGHTNESS, UNDERTONE_HUES, SKIN_CHROMA],
+                     shop=[BRANDS, PRODUCT_TYPES, THUMBNAIL_SIZE])
+
+
+def product_key(brand, product_type):
+    return f"products/{(brand or '').lower()}/{(product_type or '').lower()}"
+
+
+class BundleWriter:
+    def __init__(self):
+        self.entries = {}
+        self.chunks = []
+        self.size = 0
+
+    def add(self, key, data, kind='bytes'):
+        padding = -self.size % ALIGNMENT
+        if padding:
+            self.chunks.append(b'\0' * padding)
+            self.size += padding
+        self.entries[key] = [self.size, len(data), kind]
+        self.chunks.append(data)
+        self.size += len(data)
+
+    def add_json(self, key, value):
+        self.add(key, json.dumps(value, separators=(',', ':')).encode(), 'json')
+
+    def add_array(self, key, array):
+        self.add(key, np.ascontiguousarray(array, dtype=np.float32).tobytes(), 'float32')
+
+    def write(self, path, meta):
+        index = json.dumps({'meta': meta, 'entries': self.entries}, separators=(',', ':')).encode()
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, len(index))
+        padding = -(len(header) + len(index)) % ALIGNMENT
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(header)
+            f.write(index)
+            f.write(b'\0' * padding)
+            for chunk in self.chunks:
+                f.write(chunk)
+        os.replace(path + '.tmp', path)
+
+
+class RecommendationBundle:
+    # Read-only view of a built bundle; every lookup is a dictionary hit plus a slice of the mapping
+    def __init__(self, path=BUNDLE_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"{path} is not a recommendation bundle")
+        magic, version, index_length = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} has format {version}, expected {FORMAT_VERSION}")
+        index = json.loads(self._map[HEADER.size:HEADER.size + index_length])
+        self.meta = index['meta']
+        self.entries = index['entries']
+        self._data_start = HEADER.size + index_length + (-(HEADER.size + index_length) % ALIGNMENT)
+        self._decoded = {}
+        self._shade_index = None
+
+    def catalog_is_fresh(self, max_age=CATALOG_MAX_AGE):
+        # Products, shades and product images are a catalog snapshot; past the catalog's own refresh
+        # interval they are left to the live catalog, which keeps syncing
+        synced_at = self.meta.get('catalog_synced_at')
+        return synced_at is not None and time.time() - synced_at <= max_age
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def view(self, key):
+        # Zero-copy memoryview of an entry's bytes, or None
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        start = self._data_start + entry[0]
+        return memoryview(self._map)[start:start + entry[1]]
+
+    def read_bytes(self, key):
+        data = self.view(key)
+        return None if data is None else bytes(data)
+
+    def read_json(self, key):
+        # Decoded once per process; callers must treat the result as read-only
+        if key not in self._decoded:
+            data = self.view(key)
+            self._decoded[key] = None if data is None else json.loads(bytes(data))
+        return self._decoded[key]
+
+    def read_array(self, key, columns=3):
+        # A read-only numpy view straight onto the mapped pages
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        count = entry[1] // 4
+        return np.frombuffer(self._map, dtype=np.float32, count=count,
+                             offset=self._data_start + entry[0]).reshape(-1, columns)
+
+    def seasonal(self, undertone):
+        # One of the cached analyses for the undertone, picked per call like the live variant pool
+        variants = self.read_json(f"seasonal/{undertone.lower()}")
+        return random.choice(variants) if variants else None
+
+    def swatch(self, palette_name):
+        return self.read_bytes(f"swatch/{palette_name}")
+
+    def makeup_colors(self, skin_category, undertone):
+        colors = self.read_json(f"colors/{skin_category}/{undertone}")
+        if colors is None:
+            return None
+        return {category: [tuple(color) for color in values] for category, values in colors.items()}
+
+    def look_thumbnail(self, img_path):
+        return self.read_bytes(f"look/{os.path.basename(img_path)}")
+
+    def products(self, brand=None, product_type=None):
+        return self.read_json(product_key(brand, product_type))
+
+    def thumbnail(self, url):
+        return self.read_bytes(f"thumbnail/{url}")
+
+    def shade_index(self):
+        if self._shade_index is None and 'shades/lab' in self.entries:
+            ranges = {int(product_id): tuple(bounds)
+                      for product_id, bounds in self.read_json('shades/ranges').items()}
+            self._shade_index = ShadeIndex.from_packed(self.read_json('shades/list'), ranges,
+                                                       self.read_array('shades/lab'),
+                                                       self.meta.get('catalog_version', 0))
+        return self._shade_index
+
+
+def build_bundles(path=BUNDLE_PATH, variants=None, thumbnails=True, workers=8):
+    # Offline step (network allowed): materialize every reachable bundle, then write the file atomically
+    global _bundle, _bundle_loaded
+    from analysis import SEASONAL_VARIANTS, create_color_image, get_seasonal_cache, seasonal_key, \
+        seasonal_palettes, warm_seasonal_cache
+    from catalog import ProductCatalog
+    from makeup import LOOK_SIZE, LOOKS, look_thumbnail
+    from palette import DEFAULT_PALETTE, SKIN_LIGHTNESS, UNDERTONE_HUES, skin_anchor
+    from shop import BRANDS, PRODUCT_TYPES, get_thumbnail
+
+    # Build from the live sources, never from the bundle being replaced
+    with _bundle_lock:
+        _bundle, _bundle_loaded = None, True
+
+    variants = variants or SEASONAL_VARIANTS
+    writer = BundleWriter()
+    undertones = tuple(UNDERTONE_HUES)
+
+    warm_seasonal_cache(undertones, variants)
+    cache = get_seasonal_cache()
+    for undertone in undertones:
+        writer.add_json(f"seasonal/{undertone}", cache.values(seasonal_key(undertone))[:variants])
+    for palette_name, colors in seasonal_palettes.items():
+        writer.add(f"swatch/{palette_name}", create_color_image(colors))
+
+    # The fallback colours for a result with no measured skin tone: one batched suggestion for every anchor
+    combinations = [(category, undertone) for category in SKIN_LIGHTNESS for undertone in undertones]
+    suggestions = DEFAULT_PALETTE.suggest(np.stack([skin_anchor(*combination) for combination in combinations]))
+    for (category, undertone), colors in zip(combinations, suggestions):
+        writer.add_json(f"colors/{category}/{undertone}", colors)
+
+    for _, _, img_path in LOOKS.values():
+        thumbnail = look_thumbnail(img_path, LOOK_SIZE)
+        if thumbnail is not None:
+            writer.add(f"look/{os.path.basename(img_path)}", thumbnail)
+
+    # A fresh snapshot: the bundle's products are served only while they are younger than CATALOG_MAX_AGE
+    catalog = ProductCatalog()
+    if not catalog.load() or catalog.is_stale():
+        catalog.sync()
+    products = {}
+    for brand in BRANDS:
+        for product_type in PRODUCT_TYPES:
+            matches = catalog.query(brand=brand, product_type=product_type)
+            writer.add_json(product_key(brand, product_type), matches)
+            products.update((product['id'], product) for product in matches)
+
+    # The shade index over just the bundled products, so shade ranking never needs the catalog loaded
+    index = ShadeIndex(products.values(), catalog.version)
+    writer.add_json('shades/list', index.shades)
+    writer.add_json('shades/ranges', index.ranges)
+    writer.add_array('shades/lab', index.lab)
+
+    if thumbnails:
+        urls = sorted({product['image_link'] for product in products.values() if product.get('image_link')})
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for url, thumbnail in zip(urls, pool.map(get_thumbnail, urls)):
+                if thumbnail is not None:
+                    writer.add(f"thumbnail/{url}", thumbnail)
+
+    writer.write(path, {'fingerprint': source_fingerprint(), 'built_at': time.time(),
+                        'catalog_synced_at': catalog.synced_at, 'catalog_version': catalog.version,
+                        'products': len(products), 'seasonal_variants': variants})
+    return writer
+
+
+_bundle = None
+_bundle_loaded = False
+_bundle_lock = threading.Lock()
+
+
+def get_bundle(path=BUNDLE_PATH):
+    # Mapped once per process; None (callers compute live) if there is no bundle or it was built from other code
+    global _bundle, _bundle_loaded
+    with _bundle_lock:
+        if not _bundle_loaded:
+            _bundle_loaded = True
+            try:
+                bundle = RecommendationBundle(path)
+            except (OSError, ValueError):
+                bundle = None
+            if bundle is not None and bundle.meta.get('fingerprint') == source_fingerprint():
+                _bundle = bundle
+    return _bundle
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute every recommendation bundle into one mapped file")
+    parser.add_argument("--path", default=BUNDLE_PATH)
+    parser.add_argument("--variants", type=int, default=None, help="seasonal analyses kept per undertone")
+    parser.add_argument("--skip-thumbnails", action="store_true", help="don't fetch product images")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    writer = build_bundles(args.path, args.variants, not args.skip_thumbnails)
+    print(f"{len(writer.entries)} entries, {os.path.getsize(args.path) / 2 ** 20:.1f} MB -> {args.path} "
+          f"in {time.perf_counter() - started:.1f} s")
@@ -0,0 +1,166 @@
+# cache.py
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DIR = os.environ.get('GLOSSIERE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+
+
+class LRUCache:
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
+
+
+def cache_key(**parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+class DiskCache:
+    # SQLite-backed cache of JSON values; each key can hold a pool of variants
+    def __init__(self, name, ttl=None, max_entries=None):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        self.path = os.path.join(CACHE_DIR, f"{name}.sqlite3")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT NOT NULL,
+                variant INTEGER NOT NULL,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (key, variant)
+            )""")
+        self._db.commit()
+
+    def _live(self, key):
+        oldest = time.time() - self.ttl if self.ttl else 0
+        return self._db.execute(
+            "SELECT value FROM entries WHERE key = ? AND created >= ?", (key, oldest)).fetchall()
+
+    def get(self, key, variants=1):
+        # Misses until the key holds `variants` live entries, then serves one of them at random
+        with self._lock:
+            rows = self._live(key)
+            if len(rows) < variants:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(random.choice(rows)[0])
+
+    def count(self, key):
+        with self._lock:
+            return len(self._live(key))
+
+    def values(self, key):
+        # Every live variant of the key
+        with self._lock:
+            return [json.loads(row[0]) for row in self._live(key)]
+
+    def add(self, key, value, variants=1):
+        # Expired entries for the key are dropped; past the pool size the oldest variant is replaced
+        with self._lock:
+            oldest = time.time() - self.ttl if self.ttl else 0
+            self._db.execute("DELETE FROM entries WHERE key = ? AND created < ?", (key, oldest))
+            rows = self._db.execute(
+                "SELECT variant FROM entries WHERE key = ? ORDER BY created", (key,)).fetchall()
+            used = {row[0] for row in rows}
+            variant = next((i for i in range(variants) if i not in used), rows[0][0] if rows else 0)
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                             (key, variant, json.dumps(value), time.time()))
+            if self.max_entries:
+                # Size bound: keep only the newest max_entries rows
+                self._db.execute(
+                    "DELETE FROM entries WHERE rowid IN "
+                    "(SELECT rowid FROM entries ORDER BY created DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+class TieredCache:
+    # An in-process LRU in front of a DiskCache; disk hits are promoted into memory
+    def __init__(self, name, maxsize=256, ttl=None, max_entries=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._disk = None
+        self._lock = threading.Lock()
+
+    @property
+    def disk(self):
+        # Opened on first use so importing a module doesn't create cache files
+        with self._lock:
+            if self._disk is None:
+                self._disk = DiskCache(self.name, ttl=self.ttl, max_entries=self.max_entries)
+        return self._disk
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        self.disk.add(key, value)
+
+    def stats(self):
+        return {"memory": self.memory.stats(), "disk": self.disk.stats()}
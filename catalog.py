@@ -0,0 +1,255 @@
+# catalog.py
+import argparse
+import bisect
+import gzip
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+import numpy as np
+from cache import CACHE_DIR
+from clients import http_get
+from color import delta_e, hex_to_rgb, rgb_to_lab
+
+CATALOG_URL = os.environ.get('MAKEUP_API_URL', "https://makeup-api.herokuapp.com/api/v1/products.json")
+CATALOG_PATH = os.path.join(CACHE_DIR, 'catalog.json.gz')
+CATALOG_MAX_AGE = 24 * 3600
+# After a failed sync, wait this long before trying again
+SYNC_RETRY_INTERVAL = 5 * 60
+# The bulk download has its own circuit breaker, so its failures never block the per-query fallback
+SYNC_ENDPOINT = 'makeup-api.sync'
+
+# Only the fields the app shows or queries are stored
+PRODUCT_FIELDS = ('id', 'brand', 'name', 'price', 'price_sign', 'currency', 'image_link', 'product_link',
+                  'rating', 'category', 'product_type', 'tag_list', 'product_colors', 'updated_at')
+INDEXED_FIELDS = ('brand', 'product_type', 'category')
+
+
+def parse_price(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ProductCatalog:
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        self.products = {}
+        self.indexes = {field: defaultdict(set) for field in INDEXED_FIELDS}
+        self.prices = []
+        self.synced_at = None
+        self.version = 0
+        self.refreshing = False
+        self.failed_at = None
+        self._shade_index = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.products)
+
+    def is_stale(self, max_age=CATALOG_MAX_AGE):
+        return self.synced_at is None or time.time() - self.synced_at > max_age
+
+    def _index(self, product):
+        for field in INDEXED_FIELDS:
+            value = product.get(field)
+            if value:
+                self.indexes[field][value.lower()].add(product['id'])
+
+    def _unindex(self, product):
+        for field in INDEXED_FIELDS:
+            value = product.get(field)
+            if value:
+                self.indexes[field][value.lower()].discard(product['id'])
+
+    def _rebuild_prices(self):
+        self.prices = sorted((price, product_id) for product_id, product in self.products.items()
+                             if (price := parse_price(product.get('price'))) is not None)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        with gzip.open(self.path, 'rt') as f:
+            data = json.load(f)
+        with self._lock:
+            self.products = {}
+            self.indexes = {field: defaultdict(set) for field in INDEXED_FIELDS}
+            for product in data['products']:
+                self.products[product['id']] = product
+                self._index(product)
+            self._rebuild_prices()
+            self.synced_at = data['synced_at']
+            self.version += 1
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            data = {'synced_at': self.synced_at, 'products': list(self.products.values())}
+        with gzip.open(self.path + '.tmp', 'wt') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(self.path + '.tmp', self.path)
+
+    def sync(self, source=CATALOG_URL):
+        # Download the full dump (or read a local JSON file) and apply only what changed
+        if os.path.exists(source):
+            with open(source) as f:
+                dump = json.load(f)
+        else:
+            response = http_get(source, endpoint=SYNC_ENDPOINT, timeout=60)
+            response.raise_for_status()
+            dump = response.json()
+
+        changes = {'added': 0, 'updated': 0, 'removed': 0}
+        with self._lock:
+            seen = set()
+            for raw in dump:
+                product = {field: raw.get(field) for field in PRODUCT_FIELDS}
+                seen.add(product['id'])
+                current = self.products.get(product['id'])
+                if current is not None:
+                    if current.get('updated_at') == product['updated_at'] and current == product:
+                        continue
+                    self._unindex(current)
+                    changes['updated'] += 1
+                else:
+                    changes['added'] += 1
+                self.products[product['id']] = product
+                self._index(product)
+
+            for product_id in set(self.products) - seen:
+                self._unindex(self.products.pop(product_id))
+                changes['removed'] += 1
+
+            self._rebuild_prices()
+            self.synced_at = time.time()
+            if any(changes.values()):
+                self.version += 1
+
+        self.save()
+        return changes
+
+    def query(self, brand=None, product_type=None, category=None, min_price=None, max_price=None):
+        with self._lock:
+            candidates = []
+            for field, value in (('brand', brand), ('product_type', product_type), ('category', category)):
+                if value:
+                    candidates.append(self.indexes[field].get(value.lower(), set()))
+
+            if min_price is not None or max_price is not None:
+                low = bisect.bisect_left(self.prices, (min_price if min_price is not None else float('-inf'),))
+                high = bisect.bisect_right(self.prices, (max_price if max_price is not None else float('inf'), float('inf')))
+                candidates.append({product_id for _, product_id in self.prices[low:high]})
+
+            if not candidates:
+                ids = self.products.keys()
+            else:
+                # Intersect starting from the smallest index hit
+                candidates.sort(key=len)
+                ids = set(candidates[0]).intersection(*candidates[1:])
+            return [self.products[product_id] for product_id in sorted(ids)]
+
+
+    def shade_index(self):
+        # Rebuilt only when a load or sync has changed the catalog
+        with self._lock:
+            if self._shade_index is None or self._shade_index.version != self.version:
+                self._shade_index = ShadeIndex(self.products.values(), self.version)
+            return self._shade_index
+
+
+class ShadeIndex:
+    # Every parseable shade of every product, packed into Lab arrays; each product owns a contiguous row range
+    def __init__(self, products, version=0):
+        self.version = version
+        self.shades = []
+        self.ranges = {}
+        rgb = []
+        for product in sorted(products, key=lambda p: p['id']):
+            start = len(self.shades)
+            for shade in product.get('product_colors') or []:
+                color = hex_to_rgb(shade.get('hex_value'))
+                if color is not None:
+                    self.shades.append(shade)
+                    rgb.append(color)
+            self.ranges[product['id']] = (start, len(self.shades))
+        self.lab = rgb_to_lab(np.array(rgb, dtype=np.float64).reshape(-1, 3)).astype(np.float32)
+
+    @classmethod
+    def from_packed(cls, shades, ranges, lab, version=0):
+        # An index whose arrays were built elsewhere (e.g. a memory-mapped bundle); nothing is recomputed
+        index = cls.__new__(cls)
+        index.version = version
+        index.shades = shades
+        index.ranges = ranges
+        index.lab = lab
+        return index
+
+    def __len__(self):
+        return len(self.shades)
+
+    def nearest(self, rgb, k=5, product_id=None, max_distance=None):
+        # Returns [(shade, delta_e)] closest first, optionally limited to one product's shades
+        start, end = self.ranges.get(product_id, (0, 0)) if product_id is not None else (0, len(self.shades))
+        if start == end:
+            return []
+        distances = delta_e(rgb_to_lab(rgb), self.lab[start:end])
+        k = min(k, end - start)
+        order = np.argpartition(distances, k - 1)[:k]
+        order = order[np.argsort(distances[order])]
+        return [(self.shades[start + i], float(distances[i])) for i in order
+                if max_distance is None or distances[i] <= max_distance]
+
+    def best_matches(self, rgb):
+        # Closest shade distance for every product that has shades, from one pass over the whole index
+        if not self.shades:
+            return {}
+        distances = delta_e(rgb_to_lab(rgb), self.lab)
+        owners = [(product_id, start) for product_id, (start, end) in self.ranges.items() if end > start]
+        minima = np.minimum.reduceat(distances, [start for _, start in owners])
+        return {product_id: float(distance) for (product_id, _), distance in zip(owners, minima)}
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    # Loaded from disk once per process. Syncing (first download or refresh) only ever happens in the
+    # background, at most once per SYNC_RETRY_INTERVAL after a failure; until a first sync has succeeded
+    # this raises OSError and callers use their fallback.
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ProductCatalog()
+            _catalog.load()
+        retry_due = _catalog.failed_at is None or time.time() - _catalog.failed_at > SYNC_RETRY_INTERVAL
+        if _catalog.is_stale() and not _catalog.refreshing and retry_due:
+            _catalog.refreshing = True
+            threading.Thread(target=_refresh, args=(_catalog,), name="catalog-refresh", daemon=True).start()
+    if _catalog.synced_at is None:
+        raise OSError("The product catalog hasn't been synced yet")
+    return _catalog
+
+
+def _refresh(catalog):
+    try:
+        catalog.sync()
+        catalog.failed_at = None
+    except (OSError, ValueError):
+        catalog.failed_at = time.time()
+    finally:
+        catalog.refreshing = False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download or refresh the local product catalog")
+    parser.add_argument("--source", default=CATALOG_URL, help="API URL or a local JSON dump")
+    args = parser.parse_args()
+    catalog = ProductCatalog()
+    catalog.load()
+    changes = catalog.sync(args.source)
+    print(f"{len(catalog)} products ({changes['added']} added, {changes['updated']} updated, "
+          f"{changes['removed']} removed) -> {catalog.path}")
@@ -0,0 +1,200 @@
+# clients.py
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from urllib.parse import urlparse
+import streamlit as st
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HTTP_TIMEOUT = 10
+OPENAI_TIMEOUT = 60
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = 30
+
+
+def import_client_libraries():
+    # The client libraries take about a second to import, so they load on first use (or from
+    # a background thread once the first page is up) instead of delaying the first paint
+    import openai  # noqa: F401
+    import requests  # noqa: F401
+    import googleapiclient.discovery  # noqa: F401
+
+
+# Process-wide API clients, built once and shared by every session
+@st.cache_resource
+def get_openai_client():
+    # Retries are handled by call_endpoint so every upstream follows the same policy
+    from openai import OpenAI
+    return OpenAI(api_key=os.environ.get('OPENAI_API_KEY'), timeout=OPENAI_TIMEOUT, max_retries=0)
+
+
+@st.cache_resource
+def get_youtube_client():
+    # YOUTUBE_API_ENDPOINT points the client at another server, e.g. a local fake for tests.
+    # The bundled discovery document is used, so building the client never goes to the network.
+    from googleapiclient.discovery import build
+    endpoint = os.environ.get('YOUTUBE_API_ENDPOINT')
+    return build('youtube', 'v3', developerKey=os.environ.get('YOUTUBE_API_KEY'), static_discovery=True,
+                 client_options={'api_endpoint': endpoint} if endpoint else None)
+
+
+@st.cache_resource
+def get_http_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class CircuitOpenError(ConnectionError):
+    pass
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive failures; after `reset` seconds one trial call is let through
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset = reset
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset else "open"
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset:
+                # Half-open: push the window forward so concurrent callers keep failing fast
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record(self, success):
+        with self._lock:
+            if success:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.failures >= self.threshold:
+                    self.opened_at = time.monotonic()
+
+
+class EndpointMetrics:
+    def __init__(self, window=500):
+        self.calls = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, success):
+        with self._lock:
+            self.calls += 1
+            self.errors += not success
+            self.latencies.append(seconds)
+
+    def summary(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            calls, errors = self.calls, self.errors
+
+        def percentile(p):
+            return latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1000 if latencies else None
+        return {"calls": calls, "errors": errors, "p50_ms": percentile(0.5), "p95_ms": percentile(0.95)}
+
+
+_breakers = defaultdict(CircuitBreaker)
+_metrics = defaultdict(EndpointMetrics)
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def endpoint_metrics():
+    return {name: dict(metrics.summary(), circuit=_breakers[name].state) for name, metrics in list(_metrics.items())}
+
+
+def is_retryable(error):
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        # requests errors carry `.response`, googleapiclient errors carry `.resp`
+        response = getattr(error, 'response', None)
+        if response is None:
+            response = getattr(error, 'resp', None)
+        status = getattr(response, 'status_code', getattr(response, 'status', None))
+    if status is not None:
+        return int(status) >= 500 or int(status) == 429
+    # openai can only have raised this if it has been imported
+    openai = sys.modules.get('openai')
+    return isinstance(error, (OSError, TimeoutError) + ((openai.APIConnectionError,) if openai else ()))
+
+
+def call_endpoint(endpoint, fn, retries=MAX_RETRIES):
+    # Circuit breaker, retry with full-jitter exponential backoff, and latency metrics around one upstream call
+    breaker = _breakers[endpoint]
+    for attempt in range(retries + 1):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{endpoint} is unavailable, try again shortly")
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            _metrics[endpoint].record(time.perf_counter() - start, False)
+            breaker.record(False)
+            if attempt == retries or not is_retryable(e):
+                raise
+            time.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+        else:
+            _metrics[endpoint].record(time.perf_counter() - start, True)
+            breaker.record(True)
+            return result
+
+
+def coalesce(key, fn):
+    # Concurrent calls with the same key share one in-flight call and its result (or error)
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+    if not leader:
+        return future.result()
+
+    try:
+        future.set_result(fn())
+    except BaseException as e:
+        future.set_exception(e)
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+    return future.result()
+
+
+def http_get(url, params=None, endpoint=None, timeout=HTTP_TIMEOUT, retries=MAX_RETRIES):
+    endpoint = endpoint or urlparse(url).netloc
+
+    def fetch():
+        response = get_http_session().get(url, params=params, timeout=timeout)
+        if response.status_code >= 500 or response.status_code == 429:
+            response.raise_for_status()
+        return response
+
+    key = ('GET', url, tuple(sorted((params or {}).items())))
+    return coalesce(key, lambda: call_endpoint(endpoint, fetch, retries))
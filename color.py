@@ -0,0 +1,38 @@
+# color.py
+import re
+import numpy as np
+
+HEX_PATTERN = re.compile(r'#?([0-9a-fA-F]{6}|[0-9a-fA-F]{3})\b')
+
+# sRGB (D65) to CIE XYZ, and the D65 reference white
+RGB_TO_XYZ = np.array([[0.4124564, 0.3575761, 0.1804375],
+                       [0.2126729, 0.7151522, 0.0721750],
+                       [0.0193339, 0.1191920, 0.9503041]])
+WHITE_D65 = np.array([0.95047, 1.0, 1.08883])
+
+
+def hex_to_rgb(value):
+    # Returns None for anything that isn't a recognisable hex colour
+    match = HEX_PATTERN.search(value or '')
+    if match is None:
+        return None
+    digits = match.group(1)
+    if len(digits) == 3:
+        digits = ''.join(d * 2 for d in digits)
+    return tuple(int(digits[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def rgb_to_lab(rgb):
+    # Vectorized over any leading shape: (..., 3) RGB in 0-255 to (..., 3) CIELAB
+    srgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(srgb > 0.04045, ((srgb + 0.055) / 1.055) ** 2.4, srgb / 12.92)
+    xyz = linear @ RGB_TO_XYZ.T / WHITE_D65
+    f = np.where(xyz > 216 / 24389, np.cbrt(xyz), (24389 / 27 * xyz + 16) / 116)
+    return np.stack([116 * f[..., 1] - 16,
+                     500 * (f[..., 0] - f[..., 1]),
+                     200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+def delta_e(lab, labs):
+    # CIE76 colour difference between one Lab colour (or a batch) and an array of them
+    return np.linalg.norm(np.asarray(labs) - np.asarray(lab)[..., None, :], axis=-1)
@@ -0,0 +1,138 @@
+# ingest.py
+import threading
+from contextlib import contextmanager
+import numpy as np
+from PIL import Image, ImageOps
+
+# Uploads are decoded straight to at most MAX_SIDE on the long side: detection runs on a 640 px thumbnail
+# and skin statistics on a 256 px sample, so extra resolution only costs memory
+MAX_SIDE = 2048
+MAX_UPLOAD_BYTES = 30 * 1024 * 1024
+# Refuse anything claiming more pixels than this before decoding a single one (decompression bombs)
+MAX_SOURCE_PIXELS = 80_000_000
+# What one session may keep between reruns (its upload, the decoded frame, a video's player copy), and
+# the working memory of all decodes and video reads in flight
+SESSION_MEMORY_BUDGET = 64 * 1024 * 1024
+PROCESS_MEMORY_BUDGET = 512 * 1024 * 1024
+BUDGET_WAIT = 10
+
+
+class UploadRejected(ValueError):
+    # The message is shown to the user as is
+    pass
+
+
+class MemoryBudget:
+    # A byte budget: reserve() is a temporary charge for the duration of a block, waiting up to `timeout`
+    # for room to free up; hold() is a lasting charge under a key, replaced by the next hold of that key
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self.held = {}
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes, timeout=BUDGET_WAIT):
+        if nbytes > self.limit:
+            raise UploadRejected(f"This image needs {nbytes / 2 ** 20:.0f} MB to process, more than the "
+                                 f"{self.limit / 2 ** 20:.0f} MB allowed. Please upload a smaller image.")
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.used + nbytes <= self.limit, timeout):
+                raise UploadRejected("The server is busy processing other images. Please try again in a moment.")
+            self.used += nbytes
+            self.peak = max(self.peak, self.used)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.used -= nbytes
+                self._condition.notify_all()
+
+    def hold(self, key, nbytes):
+        with self._condition:
+            previous = self.held.get(key, 0)
+            if self.used - previous + nbytes > self.limit:
+                raise UploadRejected(f"This upload needs {nbytes / 2 ** 20:.0f} MB to keep, more than the "
+                                     f"{(self.limit - self.used + previous) / 2 ** 20:.0f} MB available. "
+                                     f"Please upload a smaller file.")
+            self.held[key] = nbytes
+            self.used += nbytes - previous
+            self.peak = max(self.peak, self.used)
+            self._condition.notify_all()
+
+    def release(self, key):
+        with self._condition:
+            self.used -= self.held.pop(key, 0)
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {"used": self.used, "peak": self.peak, "limit": self.limit}
+
+
+process_budget = MemoryBudget(PROCESS_MEMORY_BUDGET)
+
+
+def upload_size(source):
+    if hasattr(source, 'size') and isinstance(source.size, int):
+        return source.size
+    position = source.tell()
+    size = source.seek(0, 2)
+    source.seek(position)
+    return size
+
+
+def to_rgb(image):
+    # Transparent pixels are flattened onto white; every other mode (L, CMYK, I;16, P...) is converted
+    if image.mode == 'RGB':
+        return image
+    if image.mode == 'P' and 'transparency' in image.info:
+        image = image.convert('RGBA')
+    if image.mode in ('RGBA', 'LA', 'PA'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image.convert('RGBA'), mask=image.getchannel('A'))
+        return background
+    if image.mode.startswith('I;16') or image.mode in ('I', 'F'):
+        # High bit-depth greyscale: scale to 8 bits rather than clipping
+        return Image.fromarray((np.asarray(image, dtype=np.float64) / 257).clip(0, 255).astype(np.uint8)).convert('RGB')
+    return image.convert('RGB')
+
+
+def decode_image(source, max_side=MAX_SIDE):
+    # An upload (or path) as a C-contiguous (H, W, 3) uint8 RGB array, EXIF-rotated and at most `max_side`
+    # on its long side. Raises UploadRejected; the result is charged to the caller's own budget
+    if not isinstance(source, str) and upload_size(source) > MAX_UPLOAD_BYTES:
+        raise UploadRejected(f"Images must be under {MAX_UPLOAD_BYTES // 2 ** 20} MB.")
+    try:
+        image = Image.open(source)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise UploadRejected("This file couldn't be read as an image.") from e
+
+    with image:
+        width, height = image.size
+        if width * height > MAX_SOURCE_PIXELS:
+            raise UploadRejected(f"Images must be under {MAX_SOURCE_PIXELS // 1_000_000} megapixels.")
+
+        scale = min(1.0, max_side / max(width, height))
+        target = (round(width * scale), round(height * scale))
+        # For JPEG this only picks a smaller DCT scale that still covers the target; nothing is decoded yet
+        image.draft('RGB', target)
+        width, height = image.size
+        output_bytes = target[0] * target[1] * 3
+        # The decoded frame, plus the resized RGB image and the array it is copied into
+        working_bytes = width * height * max(len(image.getbands()), 3) + 2 * output_bytes
+
+        with process_budget.reserve(working_bytes):
+            try:
+                image.load()
+            except (OSError, Image.DecompressionBombError) as e:
+                raise UploadRejected("This file couldn't be read as an image.") from e
+            ImageOps.exif_transpose(image, in_place=True)
+            # thumbnail() box-reduces by the integer part of the scale before resampling the rest
+            image.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+            pixels = np.asarray(to_rgb(image))
+    # asarray of a PIL image is already a fresh C-contiguous buffer; freeze it so cached results can't drift
+    pixels.flags.writeable = False
+    return pixels
+
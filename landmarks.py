@@ -0,0 +1,112 @@
+# landmarks.py
+import os
+import threading
+from functools import lru_cache
+import cv2
+import numpy as np
+
+# OpenCV's LBF facemark model (lbfmodel.yaml from the opencv_contrib GSoC 2017 face alignment data),
+# placed in models/ (python models/fetch_models.py) or pointed to by LANDMARK_MODEL. cv2.face needs
+# opencv-contrib-python-headless (models/requirements.txt) in place of opencv-python-headless.
+LANDMARK_MODEL = os.environ.get(
+    'LANDMARK_MODEL', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'lbfmodel.yaml'))
+# Opt-in (GLOSSIERE_LANDMARKS=1): the face-shape thresholds below were calibrated on another 68-point
+# predictor, not on LBF output, so an installed model doesn't replace the box and eye-cascade heuristics by itself
+USE_LANDMARKS = os.environ.get('GLOSSIERE_LANDMARKS') == '1'
+
+# 68-point iBUG layout
+JAW = list(range(0, 17))
+RIGHT_BROW, LEFT_BROW = list(range(17, 22)), list(range(22, 27))
+RIGHT_EYE, LEFT_EYE = list(range(36, 42)), list(range(42, 48))
+NOSE_BRIDGE = 27
+CHIN = 8
+# Cheek patches: jaw line, mouth corner, nose side and lower eyelid on each side
+RIGHT_CHEEK = [1, 2, 3, 4, 48, 31, 40, 41]
+LEFT_CHEEK = [15, 14, 13, 12, 54, 35, 47, 46]
+
+
+@lru_cache(maxsize=4)
+def load_facemark(path=LANDMARK_MODEL):
+    # Loaded once per process; None when cv2.face or the model file isn't available
+    if not hasattr(cv2, 'face') or not os.path.exists(path):
+        return None
+    facemark = cv2.face.createFacemarkLBF()
+    facemark.loadModel(path)
+    return facemark
+
+
+class LandmarkEngine:
+    def __init__(self, model_path=LANDMARK_MODEL):
+        self.facemark = load_facemark(model_path)
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return self.facemark is not None
+
+    def fit(self, gray, box):
+        # Returns a (68, 2) float32 array of landmark coordinates, or None
+        with self._lock:
+            ok, points = self.facemark.fit(gray, np.array([box], dtype=np.int32))
+        if not ok or len(points) == 0:
+            return None
+        return points[0].reshape(-1, 2)
+
+    def fit_all(self, gray, boxes):
+        # Every face in one call; a list with a (68, 2) array (or None) per box
+        if len(boxes) == 0:
+            return []
+        with self._lock:
+            ok, points = self.facemark.fit(gray, np.array(boxes, dtype=np.int32).reshape(-1, 4))
+        if not ok or len(points) != len(boxes):
+            return [self.fit(gray, box) for box in boxes]
+        return [p.reshape(-1, 2) for p in points]
+
+
+# Calibrated on the sample photos with dlib's 68-point iBUG predictor (same layout as LBF; see USE_LANDMARKS).
+# Measured cheek width / face length: 0.64-0.72, every sample a visibly oval face; jaw / cheek width:
+# 0.76-0.84, none of them square-jawed. Round and square faces sit above each range.
+OVAL_MAX_WIDTH_RATIO = 0.75
+SQUARE_MIN_JAW_RATIO = 0.86
+
+
+def face_proportions(points):
+    # (cheek width / face length, jaw width / cheek width). The hairline has no landmark, so face length
+    # is chin to brow line plus the forehead's third: brow-to-chin covers two of the face's three thirds
+    cheek_width = np.linalg.norm(points[15] - points[1])
+    jaw_width = np.linalg.norm(points[12] - points[4])
+    brow_line = points[RIGHT_BROW + LEFT_BROW].mean(axis=0)
+    face_length = np.linalg.norm(points[CHIN] - brow_line) * 3 / 2
+    return float(cheek_width / face_length), float(jaw_width / cheek_width)
+
+
+def landmark_face_shape(points):
+    width_ratio, jaw_ratio = face_proportions(points)
+    if width_ratio < OVAL_MAX_WIDTH_RATIO:
+        return "Oval"
+    if jaw_ratio > SQUARE_MIN_JAW_RATIO:
+        return "Square"
+    return "Round"
+
+
+def region_mask(shape, points, regions, offset=(0, 0)):
+    mask = np.zeros(shape[:2], dtype=np.uint8)
+    for region in regions:
+        hull = cv2.convexHull((points[region] - offset).astype(np.int32))
+        cv2.fillConvexPoly(mask, hull, 255)
+    return mask
+
+
+def landmark_iris_color(face, points, offset=(0, 0)):
+    # Sample inside both eyelid outlines, keeping the mid-dark band: brighter is sclera, darkest is pupil
+    mask = region_mask(face.shape, points, [RIGHT_EYE, LEFT_EYE], offset)
+    eye_pixels = face[mask > 0]
+    if len(eye_pixels) < 10:
+        return "Unable to detect"
+    luminance = eye_pixels @ np.array([0.114, 0.587, 0.299])
+    low, high = np.percentile(luminance, [10, 50])
+    iris = eye_pixels[(luminance >= low) & (luminance <= high)]
+    if len(iris) == 0:
+        return "Unable to detect"
+    _, g, r = iris.mean(axis=0)
+    return "Brown" if r > g else "Blue/Green"
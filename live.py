@@ -0,0 +1,183 @@
+# live.py
+import argparse
+import time
+from collections import Counter
+import cv2
+import numpy as np
+from advisor import ComprehensiveMakeupAdvisor, skin_statistics
+
+TRACK_SCALE = 0.25
+TRACK_MIN_SCORE = 0.5
+# The eye cascade is the slowest step, so it only runs until this many frames agree on a colour
+EYE_COLOR_VOTES = 3
+
+
+class LiveAnalyzer:
+    # Runs face detection every `detect_every` frames, tracks the face box in between with template
+    # matching on a quarter-scale frame, and smooths the skin tone with an exponential moving average
+    def __init__(self, advisor=None, detect_every=5, alpha=0.2):
+        self.advisor = advisor or ComprehensiveMakeupAdvisor(detect_size=320, cache_size=0)
+        self.detect_every = detect_every
+        self.alpha = alpha
+        self.frame_index = 0
+        self.box = None
+        self.template = None
+        self.skin_tone = None
+        self.face_shapes = Counter()
+        self.eye_colors = Counter()
+        self.detections = 0
+        self.tracked = 0
+        self.latencies = []
+
+    def _small(self, gray):
+        return cv2.resize(gray, None, fx=TRACK_SCALE, fy=TRACK_SCALE, interpolation=cv2.INTER_AREA)
+
+    def _detect(self, gray, frame):
+        self.detections += 1
+        faces = self.advisor.detect_faces(gray)
+        if len(faces) == 0:
+            self.box = None
+            return
+        self.box = tuple(int(v) for v in max(faces, key=lambda f: f[2] * f[3]))
+        x, y, w, h = self.box
+        self.face_shapes[self.advisor.analyze_face_shape(w, h)] += 1
+        if not self.eye_colors or self.eye_colors.most_common(1)[0][1] < EYE_COLOR_VOTES:
+            eye_color = self.advisor.analyze_eye_color(gray[y:y + h, x:x + w], frame[y:y + h, x:x + w])
+            if eye_color != "Unable to detect":
+                self.eye_colors[eye_color] += 1
+        sx, sy, sw, sh = (int(v * TRACK_SCALE) for v in self.box)
+        self.template = self._small(gray)[sy:sy + sh, sx:sx + sw].copy()
+
+    def _track(self, gray):
+        # Search a window around the last box for the face template seen at the last detection
+        small = self._small(gray)
+        th, tw = self.template.shape
+        x, y = int(self.box[0] * TRACK_SCALE), int(self.box[1] * TRACK_SCALE)
+        x0, y0 = max(x - tw // 2, 0), max(y - th // 2, 0)
+        window = small[y0:y0 + th * 2, x0:x0 + tw * 2]
+        if window.shape[0] < th or window.shape[1] < tw or th == 0 or tw == 0:
+            self.box = None
+            return
+        _, score, _, (mx, my) = cv2.minMaxLoc(cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED))
+        if score < TRACK_MIN_SCORE:
+            self.box = None
+            return
+        self.tracked += 1
+        self.box = (int((x0 + mx) / TRACK_SCALE), int((y0 + my) / TRACK_SCALE), self.box[2], self.box[3])
+
+    def process(self, frame):
+        # `frame` is a BGR image as returned by cv2.VideoCapture
+        start = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.box is None or self.frame_index % self.detect_every == 0:
+            self._detect(gray, frame)
+        else:
+            self._track(gray)
+        self.frame_index += 1
+
+        if self.box is not None:
+            x, y, w, h = self.box
+            stats = skin_statistics(frame[y:y + h, x:x + w], max_side=self.advisor.skin_sample_size)
+            if stats is not None:
+                measured = np.array(stats["trimmed_mean"])
+                self.skin_tone = measured if self.skin_tone is None else \
+                    self.alpha * measured + (1 - self.alpha) * self.skin_tone
+        self.latencies.append(time.perf_counter() - start)
+        return self.result()
+
+    def result(self):
+        if self.skin_tone is None:
+            return None
+        skin_tone = tuple(int(round(c)) for c in self.skin_tone)
+        return {
+            "skin_tone": skin_tone,
+            "skin_category": self.advisor.determine_skin_category(skin_tone),
+            "undertone": self.advisor.determine_undertone(skin_tone),
+            "face_shape": self.face_shapes.most_common(1)[0][0] if self.face_shapes else "Unable to detect",
+            "eye_color": self.eye_colors.most_common(1)[0][0] if self.eye_colors else "Unable to detect",
+        }
+
+    def report(self, elapsed=None, dropped=0):
+        latencies = sorted(self.latencies)
+        processed = len(latencies)
+
+        def percentile(p):
+            return latencies[min(int(p * processed), processed - 1)] * 1000 if latencies else 0.0
+        busy = sum(latencies)
+        return {
+            "frames": processed,
+            "dropped": dropped,
+            "detections": self.detections,
+            "tracked": self.tracked,
+            "fps": processed / elapsed if elapsed else (processed / busy if busy else 0.0),
+            "max_fps": processed / busy if busy else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+        }
+
+
+def run(source, analyzer, target_fps=None, max_frames=None, show=False):
+    # With a target FPS the loop keeps real-time pace and skips frames it has fallen behind on,
+    # as a live camera would; without one, every frame of a file is analyzed as fast as possible
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise OSError(f"Cannot open video source {source!r}")
+    frame_time = 1.0 / target_fps if target_fps else 0
+    start = time.perf_counter()
+    frames_read = dropped = 0
+    try:
+        while max_frames is None or frames_read < max_frames:
+            if frame_time:
+                behind = int((time.perf_counter() - start) / frame_time) - frames_read
+                for _ in range(max(behind, 0)):
+                    if not capture.grab():
+                        break
+                    frames_read += 1
+                    dropped += 1
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames_read += 1
+            result = analyzer.process(frame)
+
+            if show:
+                if analyzer.box is not None:
+                    x, y, w, h = analyzer.box
+                    cv2.rectangle(frame, (x, y), (x + w, y + h), (203, 192, 255), 2)
+                if result:
+                    cv2.putText(frame, f"{result['skin_category']} / {result['undertone']}", (10, 30),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+                cv2.imshow("Glossiere live", frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+            if frame_time:
+                time.sleep(max(0.0, start + frames_read * frame_time - time.perf_counter()))
+    finally:
+        capture.release()
+        if show:
+            cv2.destroyAllWindows()
+    return analyzer.report(time.perf_counter() - start, dropped)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live skin tone analysis from a camera or video file")
+    parser.add_argument("--source", default="0", help="camera index or video file path")
+    parser.add_argument("--detect-every", type=int, default=5)
+    parser.add_argument("--alpha", type=float, default=0.2, help="smoothing factor for the skin tone average")
+    parser.add_argument("--target-fps", type=float, default=None)
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--show", action="store_true", help="display the annotated video")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    analyzer = LiveAnalyzer(detect_every=args.detect_every, alpha=args.alpha)
+    report = run(source, analyzer, args.target_fps, args.max_frames, args.show)
+    print(f"Result: {analyzer.result()}")
+    print(f"{report['frames']} frames analyzed, {report['dropped']} dropped, {report['detections']} detections, "
+          f"{report['tracked']} tracked")
+    print(f"{report['fps']:.1f} FPS sustained ({report['max_fps']:.1f} FPS capacity), "
+          f"latency p50 {report['p50_ms']:.1f} ms, p95 {report['p95_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,167 +1,236 @@
 import streamlit as st
-import cv2
-import numpy as np
-from PIL import Image
+import json
 import os
-from openai import OpenAI
-from googleapiclient.discovery import build
 import re
-from analysis import get_seasonal_palette
-from tutorial import generate_makeup_tutorial, display_makeup_tutorial
-from makeup import get_makeup_looks
-from shop import get_makeup_products, display_recommendations, filter_shades
+import tempfile
+import threading
+import time
+from bundles import get_bundle
+from clients import endpoint_metrics, import_client_libraries
+from pipeline import MISSING, Pipeline
+from tracing import finish_trace, span, start_trace
+from analysis import get_seasonal_palette, labelled_swatch_html
+from tutorial import SKIN_TONES, SKIN_CONDITIONS, OCCASIONS, display_makeup_tutorial, show_makeup_tutorial
+from ingest import SESSION_MEMORY_BUDGET, MemoryBudget, UploadRejected, decode_image, process_budget
+from makeup import get_makeup_looks, look_thumbnail
+from palette import DEFAULT_SKIN_CATEGORY, DEFAULT_UNDERTONE
+from shop import BRANDS, PRODUCT_TYPES, get_makeup_products, display_recommendations, filter_shades
 
 st.set_page_config(page_title="Glossiere: AI Beauty Assistant", layout="wide")
 
-# Initialize API clients
-client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
-youtube = build('youtube', 'v3', developerKey=os.environ.get('YOUTUBE_API_KEY'))
-
-class ComprehensiveMakeupAdvisor:
-    def __init__(self):
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
-
-    def analyze_image(self, image):
-        # Convert PIL Image to cv2 format
-        cv2_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-        gray = cv2.cvtColor(cv2_image, cv2.COLOR_BGR2GRAY)
-
-        # Detect face
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-
-        if len(faces) == 0:
-            return None, "No face detected"
-
-        # Analyze the largest face
-        x, y, w, h = max(faces, key=lambda x: x[2] * x[3])
-        face = cv2_image[y:y + h, x:x + w]
-
-        # Skin tone analysis
-        skin_tone, skin_info = self.analyze_skin_tone(face)
-
-        # Face shape analysis
-        face_shape = self.analyze_face_shape(w, h)
-
-        # Eye color analysis
-        eye_color = self.analyze_eye_color(gray[y:y + h, x:x + w], face)
-
-        return {
-            "skin_tone": skin_tone,
-            "skin_category": skin_info[0],
-            "undertone": skin_info[1],
-            "face_shape": face_shape,
-            "eye_color": eye_color
-        }, "Success"
-
-    def analyze_skin_tone(self, face):
-        # Convert to YCrCb color space
-        ycrcb_image = cv2.cvtColor(face, cv2.COLOR_BGR2YCrCb)
-
-        # Define skin color bounds
-        lower_skin = np.array([0, 135, 85])
-        upper_skin = np.array([255, 180, 135])
-
-        # Create and apply skin mask
-        skin_mask = cv2.inRange(ycrcb_image, lower_skin, upper_skin)
-        skin = cv2.bitwise_and(face, face, mask=skin_mask)
-
-        if np.sum(skin_mask) > 0:
-            skin_tone = cv2.mean(skin, mask=skin_mask)[:3]
-            rgb_skin_tone = tuple(reversed([int(c) for c in skin_tone]))
-            category = self.determine_skin_category(rgb_skin_tone)
-            undertone = self.determine_undertone(rgb_skin_tone)
-            return rgb_skin_tone, (category, undertone)
-
-        return None, (None, None)
-
-    def determine_skin_category(self, rgb_color):
-        luminance = 0.299 * rgb_color[0] + 0.587 * rgb_color[1] + 0.114 * rgb_color[2]
-        categories = [
-            (200, 'very_light'), (180, 'light'), (160, 'light_medium'),
-            (140, 'medium'), (120, 'medium_deep'), (100, 'deep'), (0, 'very_deep')
-        ]
-        for threshold, category in categories:
-            if luminance > threshold:
-                return category
-        return 'very_deep'
-
-    def determine_undertone(self, rgb_color):
-        r, g, b = rgb_color
-        if r > g and r > b:
-            return 'warm'
-        elif b > r and b > g:
-            return 'cool'
-        return 'neutral'
-
-    def analyze_face_shape(self, width, height):
-        face_ratio = width / height
-        if face_ratio > 0.95:
-            return "Round"
-        elif face_ratio < 0.85:
-            return "Oval"
-        return "Square"
-
-    def analyze_eye_color(self, gray_face, color_face):
-        eyes = self.eye_cascade.detectMultiScale(gray_face)
-        if len(eyes) > 0:
-            ex, ey, ew, eh = eyes[0]
-            eye = color_face[ey:ey + eh, ex:ex + ew]
-            average_color = np.mean(eye, axis=(0, 1))
-            _, g, r = average_color
-            return "Brown" if r > g else "Blue/Green"
-        return "Unable to detect"
-
-    def suggest_makeup_colors(self, analysis_result):
-        skin_category = analysis_result['skin_category']
-        undertone = analysis_result['undertone']
-
-        return {
-            'foundation': self.adjust_foundation_color(skin_category),
-            'blush': self.adjust_blush_color(skin_category, undertone),
-            'eyeshadow': self.adjust_eyeshadow_color(skin_category, undertone),
-            'lipstick': self.adjust_lipstick_color(skin_category, undertone)
-        }
+BANNER_IMAGE = "/Users/nuraziraatikah/Library/Mobile Documents/com~apple~CloudDocs/PART 5/AI NUSANTARA/makeup2.jpg"
 
-    def adjust_foundation_color(self, category):
-        base_colors = {
-            'very_light': [(255, 235, 220), (255, 233, 215), (255, 230, 210)],
-            'light': [(245, 225, 210), (245, 223, 205), (245, 220, 200)],
-            'light_medium': [(235, 215, 200), (235, 213, 195), (235, 210, 190)],
-            'medium': [(225, 205, 190), (225, 203, 185), (225, 200, 180)],
-            'medium_deep': [(215, 195, 180), (215, 193, 175), (215, 190, 170)],
-            'deep': [(205, 185, 170), (205, 183, 165), (205, 180, 160)],
-            'very_deep': [(195, 175, 160), (195, 173, 155), (195, 170, 150)]
-        }
-        return base_colors.get(category, base_colors['medium'])
 
-    def adjust_blush_color(self, category, undertone):
-        if undertone == 'warm':
-            return [(255, 190, 180), (255, 150, 130), (255, 160, 122)]
-        elif undertone == 'cool':
-            return [(255, 192, 203), (255, 182, 193), (219, 112, 147)]
-        return [(255, 192, 203), (255, 160, 122), (255, 228, 225)]
+@st.cache_resource
+def get_advisor():
+    # OpenCV and numpy are imported here, after the page has started rendering
+    from advisor import ComprehensiveMakeupAdvisor
+    advisor = ComprehensiveMakeupAdvisor()
+    advisor.warm_up()
+    return advisor
+
 
-    def adjust_eyeshadow_color(self, category, undertone):
-        if undertone == 'warm':
-            return [(255, 222, 173), (210, 180, 140), (188, 143, 143)]
-        elif undertone == 'cool':
-            return [(230, 230, 250), (216, 191, 216), (221, 160, 221)]
-        return [(245, 222, 179), (222, 184, 135), (210, 180, 140)]
+@st.cache_resource
+def preload_client_libraries():
+    # Once per process: import the API client libraries in the background while the user picks a photo
+    thread = threading.Thread(target=import_client_libraries, name="preload-clients", daemon=True)
+    thread.start()
+    return thread
 
-    def adjust_lipstick_color(self, category, undertone):
-        if undertone == 'warm':
-            return [(255, 125, 100), (255, 99, 71), (205, 92, 92)]
-        elif undertone == 'cool':
-            return [(219, 112, 147), (255, 0, 127), (199, 21, 133)]
-        return [(255, 160, 122), (205, 92, 92), (250, 128, 114)]
 
+@st.cache_data(max_entries=8, show_spinner=False)
+def analyze_video(data, max_frames=300):
+    # Uploaded clips go through the same detect-and-track loop as the live camera mode
+    from live import LiveAnalyzer, run as run_video
+    with tempfile.NamedTemporaryFile(suffix='.mp4') as video_file:
+        video_file.write(data)
+        video_file.flush()
+        analyzer = LiveAnalyzer(advisor=get_advisor())
+        report = run_video(video_file.name, analyzer, max_frames=max_frames)
+    return analyzer.result(), report
 
-def rgb_to_hex(rgb):
-    return '#{:02x}{:02x}{:02x}'.format(int(rgb[0]), int(rgb[1]), int(rgb[2]))
+
+def show_debug_panel(trace):
+    with st.sidebar:
+        st.header("Timings for this rerun")
+        st.dataframe([{"stage": s["stage"], "calls": s["calls"], "total ms": round(s["total_ms"], 1)}
+                      for s in trace.summary()], hide_index=True)
+        st.download_button("Download Chrome trace", json.dumps(trace.chrome_events(), default=str),
+                           file_name="glossiere-trace.json", mime="application/json")
+
+
+def session_budget():
+    return st.session_state.setdefault('memory_budget', MemoryBudget(SESSION_MEMORY_BUDGET))
+
+
+def decode_upload(pipeline, file):
+    # Bounded decode straight to an RGB array, once per uploaded file; oversized or unreadable uploads
+    # get a message instead
+    budget = session_budget()
+
+    def decode():
+        with span("image.decode"):
+            pixels = decode_image(file)
+        # The array stays in the session's memo until the next upload replaces it, and so does its charge
+        budget.hold("decode", pixels.nbytes)
+        return pixels
+
+    try:
+        # The encoded upload stays in the uploader while it is selected
+        budget.hold("upload", file.size)
+        return pipeline.run("decode", decode, {"file": file.file_id})
+    except UploadRejected as e:
+        st.error(str(e))
+        return None
+
+
+def keep_video(video):
+    # A video is kept twice for the session: by the uploader and as st.video's media file
+    try:
+        session_budget().hold("upload", 2 * video.size)
+    except UploadRejected as e:
+        st.error(str(e))
+        return None
+    return video
+
+
+def choose_face(pixels, faces):
+    # Group photos: every face is analyzed in one pass, and the tabs follow the person picked here
+    if len(faces) <= 1:
+        return faces[0] if faces else None
+    labels = [f"Person {i + 1}" for i in range(len(faces))]
+    # The crops are views into the decoded frame, and st.image keeps each only as a 100 px JPEG
+    st.image([pixels[y:y + h, x:x + w] for x, y, w, h in (face['box'] for face in faces)],
+             caption=labels, width=100)
+    selected = st.radio("Show results for:", range(len(faces)), format_func=lambda i: labels[i], horizontal=True)
+    return faces[selected]
+
+
+def show_results(advisor, analysis_result, pipeline=None):
+    # Each tab renders every rerun, but its stage only recomputes when the inputs it declares have changed
+    pipeline = pipeline or Pipeline(st.session_state)
+    skin = {"skin_tone": analysis_result['skin_tone'], "skin_category": analysis_result['skin_category'],
+            "undertone": analysis_result['undertone']}
+    # A face whose skin couldn't be measured (no skin-coloured pixels in its box) gets the default skin's advice
+    skin_category = analysis_result['skin_category'] or DEFAULT_SKIN_CATEGORY
+    undertone = analysis_result['undertone'] or DEFAULT_UNDERTONE
+
+    # Display analysis results
+    st.subheader("Analysis Results")
+    if analysis_result['skin_category'] is None:
+        st.warning("Your skin tone couldn't be measured in this photo, so these suggestions are for a "
+                   f"{skin_category} skin tone with a {undertone} undertone. A photo in natural light "
+                   "usually works better.")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.write(f"Skin Tone: {analysis_result['skin_category'].replace('_', ' ').title()}"
+               if analysis_result['skin_category'] else "Skin Tone: Unable to detect")
+    col2.write(f"Undertone: {analysis_result['undertone'].title()}"
+               if analysis_result['undertone'] else "Undertone: Unable to detect")
+    col3.write(f"Face Shape: {analysis_result['face_shape']}")
+    col4.write(f"Eye Color: {analysis_result['eye_color']}")
+
+    # Create tabs
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(
+        ["Seasonal Palette", "Make Up Shades", "Tutorials", "Make Up Suggestions", "Shop"])
+
+    with tab1, span("tab.seasonal_palette"):
+        st.header("Face Analysis")
+        st.subheader("Suitable Seasonal Colour Palette")
+        results = pipeline.run("palette", lambda: get_seasonal_palette(undertone), {"undertone": undertone})
+
+        st.write(results["analysis"])
+
+        for palette_name, palette_data in results["palettes"].items():
+            st.write(f"Colors for {palette_name.capitalize()}:")
+            st.image(palette_data["image"], caption=f"{palette_name.capitalize()} Palette",
+                     use_column_width=True)
+
+    with tab2, span("tab.makeup_shades"):
+        # Get and display color palette
+        st.header("Suggested Makeup Palette")
+        makeup_palette = pipeline.run("makeup_colors", lambda: advisor.suggest_makeup_colors(analysis_result), skin)
+
+        for category, colors in makeup_palette.items():
+            st.write(f"#### {category.title()}")
+            cols = st.columns(len(colors))
+            for idx, color in enumerate(colors):
+                cols[idx].markdown(labelled_swatch_html(tuple(color)), unsafe_allow_html=True)
+
+    with tab3, span("tab.tutorials"):
+        st.header("Personalized Makeup Tutorial")
+
+        # Inputs for makeup tutorial
+        skin_tone = st.selectbox("Select your skin tone:", SKIN_TONES)
+        skin_condition = st.selectbox("Select your skin condition:", SKIN_CONDITIONS)
+        occasion = st.selectbox("Select the occasion:", OCCASIONS)
+
+        # Once generated, the tutorial and its videos (failed lookups too) stay up across reruns without
+        # searching again, until one of its selections changes or the button is clicked again
+        tutorial_inputs = {"skin_tone": skin_tone, "skin_condition": skin_condition, "occasion": occasion}
+        if st.button("Generate Makeup Tutorial"):
+            pipeline.run("tutorial", lambda: show_makeup_tutorial(skin_tone, skin_condition, occasion),
+                         tutorial_inputs, force=True)
+        else:
+            tutorial = pipeline.cached("tutorial", tutorial_inputs)
+            if tutorial is not MISSING:
+                text, videos = tutorial
+                display_makeup_tutorial(text, videos=videos)
+
+    with tab4, span("tab.suggestions"):
+        st.title("Makeup Looks by Face Shape")
+
+        face_shape = st.selectbox("Select your face shape:", ["Oval", "Square", "Round"])
+
+        if face_shape:
+            # Thumbnails are pre-resized and encoded once per process, so reruns don't decode the photos
+            looks = pipeline.run("looks", lambda: [(look, description, look_thumbnail(img_path)) for
+                                                   look, description, img_path in get_makeup_looks(face_shape) or ()],
+                                 {"face_shape": face_shape})
+
+            if looks:
+                st.subheader(f"Suitable Makeup Looks for {face_shape} Face Shape:")
+                for look, description, thumbnail in looks:
+                    # Create two columns: one for the image and one for the text
+                    col1, col2 = st.columns([1, 2])
+                    with col1:
+                        if thumbnail is not None:
+                            st.image(thumbnail, caption=look, use_column_width=False)
+                        else:
+                            st.write("Image not found. Please check the path.")
+
+                    with col2:
+                        st.write(f"**{look}**: {description}")
+
+            else:
+                st.write("Please select a valid face shape.")
+
+    with tab5, span("tab.shop"):
+        st.header("Recommended Makeup Products")
+
+        brand = st.selectbox("Select a brand", options=BRANDS, index=0)
+        product_type = st.selectbox("Select a product type", options=PRODUCT_TYPES, index=0)
+
+        # The fetched products are remembered, so paging and sorting reruns keep showing them
+        shop_inputs = {"brand": brand, "product_type": product_type}
+        if st.button("Get Product Recommendations"):
+            # A click always fetches again, so a failed or empty fetch can be retried
+            products = pipeline.run("shop", lambda: get_makeup_products(brand, product_type), shop_inputs,
+                                    force=True)
+        else:
+            products = pipeline.cached("shop", shop_inputs)
+        if products is not MISSING:
+            if products:
+                display_recommendations(products, skin_category, undertone, analysis_result['skin_tone'], pipeline)
+            else:
+                st.write("No products found. Try changing your preferences.")
 
 
 def main():
+    trace = start_trace("rerun")
+    pipeline = Pipeline(st.session_state)
+    if 'session_start' not in st.session_state:
+        st.session_state['session_start'] = time.perf_counter()
+
     # Custom CSS for changing sidebar background and text color
     st.markdown(
         """
@@ -207,7 +276,9 @@ def main():
     """, unsafe_allow_html=True)
 
     st.title("Glossièrè: AI Beauty Assistant 💄")
-    st.image("/Users/nuraziraatikah/Library/Mobile Documents/com~apple~CloudDocs/PART 5/AI NUSANTARA/makeup2.jpg", width=800)
+    # The banner lives outside the repo; a worker without it still renders the page
+    if os.path.exists(BANNER_IMAGE):
+        st.image(BANNER_IMAGE, width=800)
     emoji_text = "Hello! Let's get started with your beauty analysis. 💃"
     st.markdown(emoji_text)
     st.markdown("""
@@ -215,6 +286,14 @@ def main():
             and match it to the most flattering color palette for you. 
             It will then suggest you makeup products and tutorials that suits your face without having to pay!
             """)
+
+    # Startup warm-up, after the header has painted: loads the cascades once per process, not once per rerun
+    with span("startup.advisor"):
+        advisor = get_advisor()
+    with span("startup.bundles"):
+        bundle = get_bundle()
+    preload_client_libraries()
+
     with st.sidebar:
         st.title("Welcome to Glossièrè 💋 ")
         st.header("How It Works")
@@ -234,151 +313,93 @@ def main():
         5. Adjust your camera settings to capture a clear and natural image
         """)
 
-    advisor = ComprehensiveMakeupAdvisor()
-
+        if advisor.warm_up_seconds is not None:
+            st.caption(f"Analyzer warm-up: {advisor.warm_up_seconds * 1000:.1f} ms")
+        if 'time_to_first_analysis' in st.session_state:
+            st.caption(f"Time to first analysis: {st.session_state['time_to_first_analysis']:.2f} s")
+        if bundle is not None:
+            st.caption(f"Precomputed bundles: {len(bundle)} entries, built "
+                       f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(bundle.meta['built_at']))}")
+        cache_stats = advisor.results_cache.stats()
+        st.caption(f"Analysis cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+        upstreams = endpoint_metrics()
+        if upstreams:
+            with st.expander("Upstream latency"):
+                for name, stats in upstreams.items():
+                    st.caption(f"{name}: {stats['calls']} calls, {stats['errors']} errors, "
+                               f"p50 {stats['p50_ms']:.0f} ms, p95 {stats['p95_ms']:.0f} ms, circuit {stats['circuit']}")
+        st.checkbox("Show stage timings", key='debug_timings')
 
     # Image input
     col1, col2 = st.columns(2)
     with col1:
-        input_option = st.radio("Choose input method:", ['Upload Image', 'Use Camera'])
+        input_option = st.radio("Choose input method:", ['Upload Image', 'Use Camera', 'Upload Video'])
+        group_photo = input_option != 'Upload Video' and st.checkbox("Analyze every face (group photo)")
 
     with col2:
         skin_type = st.selectbox("Select your skin type:", ["Normal", "Dry", "Oily", "Combination", "Sensitive"])
         occasion = st.selectbox("Select the occasion:", ["Everyday", "Work", "Date Night", "Wedding", "Party"])
 
     image = None
+    video = None
     if input_option == 'Upload Image':
         uploaded_file = st.file_uploader("Choose an image...", type=['jpg', 'jpeg', 'png'])
-        if uploaded_file is not None:
-            image = Image.open(uploaded_file)
+    elif input_option == 'Upload Video':
+        uploaded_file = st.file_uploader("Choose a video...", type=['mp4', 'mov', 'avi'])
+    else:
+        uploaded_file = st.camera_input("Take a picture")
+    if uploaded_file is None:
+        session_budget().release("upload")
+    elif input_option == 'Upload Video':
+        video = keep_video(uploaded_file)
     else:
-        camera_image = st.camera_input("Take a picture")
-        if camera_image is not None:
-            image = Image.open(camera_image)
+        image = decode_upload(pipeline, uploaded_file)
 
-    if image is not None:
+    if image is not None or video is not None:
         with st.spinner('Analyzing your features...'):
-            # Display original image
-            st.subheader("Your Image")
-            st.image(image, width=200)
-
-            # Analyze image
-            analysis_result, message = advisor.analyze_image(image)
+            if image is not None:
+                # Display original image
+                st.subheader("Your Image")
+                st.image(image, width=200)
+
+                # Analyze image, again only when the decoded image or the group-photo choice changed
+                analysis, message = pipeline.run(
+                    "analysis", lambda: advisor.analyze_image(image, all_faces=group_photo),
+                    {"source": "image", "group_photo": group_photo}, after=("decode",))
+                analysis_result = choose_face(image, analysis) if group_photo else analysis
+            else:
+                st.subheader("Your Video")
+                st.video(video)
+
+                def analyze():
+                    # getvalue() copies the whole clip, so the copy is working memory while it is analyzed
+                    with span("video.analysis"), process_budget.reserve(video.size):
+                        return analyze_video(video.getvalue())
+
+                try:
+                    analysis_result, report = pipeline.run("analysis", analyze,
+                                                           {"source": "video", "file": video.file_id})
+                except UploadRejected as e:
+                    st.error(str(e))
+                    analysis_result = None
+                else:
+                    st.caption(f"{report['frames']} frames at {report['fps']:.1f} FPS "
+                               f"({report['detections']} detections, {report['tracked']} tracked), "
+                               f"latency p50 {report['p50_ms']:.1f} ms, p95 {report['p95_ms']:.1f} ms")
+            if analysis_result is not None and 'time_to_first_analysis' not in st.session_state:
+                st.session_state['time_to_first_analysis'] = time.perf_counter() - st.session_state['session_start']
 
             if analysis_result is not None:
-                # Display analysis results
-                st.subheader("Analysis Results")
-                col1, col2, col3, col4 = st.columns(4)
-                col1.write(f"Skin Tone: {analysis_result['skin_category'].replace('_', ' ').title()}")
-                col2.write(f"Undertone: {analysis_result['undertone'].title()}")
-                col3.write(f"Face Shape: {analysis_result['face_shape']}")
-                col4.write(f"Eye Color: {analysis_result['eye_color']}")
-
-                # Create tabs
-                tab1, tab2, tab3, tab4, tab5 = st.tabs(
-                    ["Seasonal Palette", "Make Up Shades", "Tutorials", "Make Up Suggestions", "Shop"])
-
-                with tab1:
-                    st.header("Face Analysis")
-                    st.subheader("Suitable Seasonal Colour Palette")
-                    results = get_seasonal_palette(analysis_result['undertone'])
-
-                    st.write(results["analysis"])
-
-                    for palette_name, palette_data in results["palettes"].items():
-                        st.write(f"Colors for {palette_name.capitalize()}:")
-                        st.image(palette_data["image"], caption=f"{palette_name.capitalize()} Palette",
-                                 use_column_width=True)
-
-                with tab2:
-                    # Get and display color palette
-                    st.header("Suggested Makeup Palette")
-                    makeup_palette = advisor.suggest_makeup_colors(analysis_result)
-
-                    for category, colors in makeup_palette.items():
-                        st.write(f"#### {category.title()}")
-                        cols = st.columns(len(colors))
-                        for idx, color in enumerate(colors):
-                            hex_color = rgb_to_hex(color)
-                            cols[idx].markdown(f"""
-                            <div style="text-align: center;">
-                                <div style="background-color: {hex_color}; width: 50px; height: 50px; margin: 0 auto; border: 1px solid black;"></div>
-                                <p style="margin: 5px 0;">RGB: {color}</p>
-                                <p style="margin: 0;">HEX: {hex_color}</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-
-                with tab3:
-                    st.header("Personalized Makeup Tutorial")
-
-                    # Inputs for makeup tutorial
-                    skin_tone = st.selectbox("Select your skin tone:",
-                                             ["Very Light", "Light", "Light Medium", "Medium", "Medium Deep", "Deep",
-                                              "Very Deep"])
-                    skin_condition = st.selectbox("Select your skin condition:",
-                                                  ["Normal", "Dry", "Oily", "Combination", "Sensitive"])
-                    occasion = st.selectbox("Select the occasion:", ["Everyday", "Work", "Date Night", "Special Event"])
-
-                    if st.button("Generate Makeup Tutorial"):
-                        tutorial = generate_makeup_tutorial(skin_tone, skin_condition, occasion)
-                        display_makeup_tutorial(tutorial)
-
-                    with tab4:
-                        st.title("Makeup Looks by Face Shape")
-
-                        face_shape = st.selectbox("Select your face shape:", ["Oval", "Square", "Round"])
-
-                        if face_shape:
-                            looks = get_makeup_looks(face_shape)
-
-                            if looks:
-                                st.subheader(f"Suitable Makeup Looks for {face_shape} Face Shape:")
-                                for look, description, img_path in looks:
-                                    # Create two columns: one for the image and one for the text
-                                    col1, col2 = st.columns([1, 2])
-                                    # Load the image
-                                    try:
-                                        image = Image.open(img_path)
-                                        # Resize the image
-                                        image = image.resize((300, 350))  # Set desired width and height
-                                        with col1:
-                                            st.image(image, caption=look, use_column_width=False)
-                                    except FileNotFoundError:
-                                        with col1:
-                                            st.write("Image not found. Please check the path.")
-
-                                    with col2:
-                                        st.write(f"**{look}**: {description}")
-
-                            else:
-                                st.write("Please select a valid face shape.")
-
-                    with tab5:
-                        st.header("Recommended Makeup Products")
-
-                        brand = st.selectbox(
-                            "Select a brand",
-                            options=['Maybelline', 'Revlon', 'L\'Oreal', 'Dior', 'Covergirl', 'Clinique', 'NYX',
-                                     'e.l.f.',
-                                     'MAC', 'Fenty Beauty'],
-                            index=0
-                        )
-                        product_type = st.selectbox(
-                            "Select a product type",
-                            options=['lipstick', 'foundation', 'eyeshadow', 'mascara', 'blush', 'bronzer'],
-                            index=0
-                        )
-
-                        if st.button("Get Product Recommendations"):
-                            products = get_makeup_products(brand, product_type)
-                            if products:
-                                display_recommendations(products, analysis_result['skin_category'],
-                                                        analysis_result['undertone'])
-                            else:
-                                st.write("No products found. Try changing your preferences.")
+                show_results(advisor, analysis_result, pipeline)
 
     st.markdown("---")
 
+    st.sidebar.caption(f"Stages this rerun: {len(pipeline.executed)} executed, {len(pipeline.skipped)} skipped")
+
+    finish_trace(trace)
+    if st.session_state.get('debug_timings'):
+        show_debug_panel(trace)
+
 
 if __name__ == "__main__":
     main()
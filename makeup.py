@@ -1,51 +1,112 @@
 # makeup.py
+import io
+import os
+from functools import lru_cache
+from types import MappingProxyType
+from PIL import Image
+from bundles import get_bundle
+from cache import CACHE_DIR
+
+LOOK_SIZE = (300, 350)
+LOOK_THUMBNAIL_DIR = os.path.join(CACHE_DIR, 'looks')
+# Look photos are looked up under images/ first (the original layout), then next to this module
+LOOK_IMAGE_DIRS = ('images', os.path.dirname(os.path.abspath(__file__)))
+
+# Each look is defined once and shared by every face shape that suggests it: (name, description, image path)
+LOOKS = MappingProxyType({
+    "natural": ("Natural 'No-Makeup' Makeup",
+                "This style focuses on enhancing the skin's natural beauty with minimal products. It typically "
+                "involves a lightweight foundation or tinted moisturizer, subtle blush, and neutral tones for the "
+                "eyes and lips, creating an effortless and fresh appearance..",
+                "images/natural_makeup.jpg"),
+    "soft_glam": ("Soft Glam",
+                  "Soft glam is a polished yet natural look that emphasizes glowing skin and blended, neutral "
+                  "eyeshadow shades. It combines light layers of makeup, including shimmer and matte finishes, to "
+                  "achieve a soft, ethereal effect that enhances the wearer’s features without appearing heavy or "
+                  "overdone.",
+                  "images/soft_glam.jpg"),
+    "dewy_glow": ("Dewy, Glowy Skin",
+                  "The dewy glow makeup style aims for a fresh, hydrated look with luminous skin. It incorporates "
+                  "products like liquid highlighters and hydrating foundations to create a radiant finish. This "
+                  "style often features soft blush and glossy lips to enhance the overall glow.",
+                  "images/dewy_glow.jpg"),
+    "classic_retro": ("Classic Retro",
+                      "Classic retro makeup draws inspiration from past decades, often featuring bold winged "
+                      "eyeliner, defined brows, and red lips. This look emphasizes dramatic eye makeup paired with "
+                      "a flawless complexion, evoking vintage glamour reminiscent of the 1950s and 1960s.",
+                      "images/classic_retro.jpg"),
+    "smokey_eye": ("Smokey Eye",
+                   "The smoky eye is characterized by dark, blended eyeshadow that creates depth and drama around "
+                   "the eyes. This style can range from subtle to bold, often using shades like black, gray, or "
+                   "deep brown to achieve a sultry effect, typically complemented by nude or soft lip colors.",
+                   "images/smokey_eye.jpg"),
+    "thai": ("Thai Makeup",
+             "Bright colors bring out features while contouring softens the jawline.",
+             "images/thai_makeup.jpg"),
+    "arabic": ("Arabic Makeup",
+               "Arabic makeup is known for its boldness and emphasis on the eyes. It often includes dramatic "
+               "eyeliner (such as kohl), heavy eyeshadow in rich colors, and full lashes. The lips are usually kept "
+               "more neutral or lightly colored to balance the striking eye makeup, creating a captivating overall "
+               "appearance.",
+               "images/arabic_makeup.jpg"),
+})
+
+LOOKS_BY_FACE_SHAPE = MappingProxyType({
+    "oval": tuple(LOOKS[key] for key in ("natural", "soft_glam", "dewy_glow", "classic_retro")),
+    "square": tuple(LOOKS[key] for key in ("soft_glam", "classic_retro", "smokey_eye", "thai")),
+    "round": tuple(LOOKS[key] for key in ("arabic", "smokey_eye", "dewy_glow", "soft_glam")),
+})
+
 
 def get_makeup_looks(face_shape):
-    makeup_looks = {
-        "oval": [
-            ("Natural 'No-Makeup' Makeup", """
-            This style focuses on enhancing the skin's natural beauty with minimal products. 
-            It typically involves a lightweight foundation or tinted moisturizer, subtle blush, and neutral tones for the eyes and lips, creating an effortless and fresh appearance..""",
-            "images/natural_makeup.jpg"),
-            ("Soft Glam", """Soft glam is a polished yet natural look that emphasizes glowing skin and blended, neutral eyeshadow shades. It combines light layers of makeup, 
-            including shimmer and matte finishes, to achieve a soft, ethereal effect that enhances the wearer’s features without appearing heavy or overdone.""",
-            "images/soft_glam.jpg"),
-            ("Dewy, Glowy Skin", """The dewy glow makeup style aims for a fresh, hydrated look with luminous skin. It incorporates products like liquid highlighters and 
-            hydrating foundations to create a radiant finish. This style often features soft blush and glossy lips to enhance the overall glow.""", "images/dewy_glow.jpg"),
-            ("Classic Retro", """Classic retro makeup draws inspiration from past decades, often featuring bold winged eyeliner, defined brows, and red lips. 
-            This look emphasizes dramatic eye makeup paired with a flawless complexion, evoking vintage glamour reminiscent of the 1950s and 1960s.""",
-            "images/classic_retro.jpg")
-        ],
-        "square": [
-            ("Soft Glam", """Soft glam is a polished yet natural look that emphasizes glowing skin and blended, neutral eyeshadow shades. It combines light layers of makeup, 
-                        including shimmer and matte finishes, to achieve a soft, ethereal effect that enhances the wearer’s features without appearing heavy or overdone.""",
-             "images/soft_glam.jpg"),
-            ("Classic Retro", """Classic retro makeup draws inspiration from past decades, often featuring bold winged eyeliner, defined brows, and red lips. 
-                        This look emphasizes dramatic eye makeup paired with a flawless complexion, evoking vintage glamour reminiscent of the 1950s and 1960s.""",
-             "images/classic_retro.jpg"),
-            ("Smokey Eye", """"The smoky eye is characterized by dark, blended eyeshadow that creates depth and drama around the eyes. 
-            This style can range from subtle to bold, often using shades like black, gray, or deep brown to achieve a sultry effect, 
-            typically complemented by nude or soft lip colors.""", "images/smokey_eye.jpg"),
-            ("Thai Makeup", "Bright colors bring out features while contouring softens the jawline.", "images/thai_makeup.jpg")
-        ],
-        "round": [
-            ("Arabic Makeup", """Arabic makeup is known for its boldness and emphasis on the eyes. 
-            It often includes dramatic eyeliner (such as kohl), heavy eyeshadow in rich colors, and full lashes. 
-            The lips are usually kept more neutral or lightly colored to balance the striking eye makeup, creating a captivating overall appearance.""",
-             "images/arabic_makeup.jpg"),
-            ("Smokey Eye", """"The smoky eye is characterized by dark, blended eyeshadow that creates depth and drama around the eyes. 
-                        This style can range from subtle to bold, often using shades like black, gray, or deep brown to achieve a sultry effect, 
-                        typically complemented by nude or soft lip colors.""", "images/smokey_eye.jpg"),
-            ("Dewy, Glowy Skin", """The dewy glow makeup style aims for a fresh, hydrated look with luminous skin. It incorporates products like liquid highlighters and 
-                        hydrating foundations to create a radiant finish. This style often features soft blush and glossy lips to enhance the overall glow.""",
-            "images/dewy_glow.jpg"),
-            ("Soft Glam", """Soft glam is a polished yet natural look that emphasizes glowing skin and blended, neutral eyeshadow shades. It combines light layers of makeup, 
-                        including shimmer and matte finishes, to achieve a soft, ethereal effect that enhances the wearer’s features without appearing heavy or overdone.""",
-             "images/soft_glam.jpg"),
-        ]
-    }
-
-    if face_shape.lower() in makeup_looks:
-        return makeup_looks[face_shape.lower()]
-    else:
+    return LOOKS_BY_FACE_SHAPE.get(face_shape.lower())
+
+
+def find_look_image(img_path):
+    name = os.path.basename(img_path)
+    for directory in LOOK_IMAGE_DIRS:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+@lru_cache(maxsize=32)
+def look_thumbnail(img_path, size=LOOK_SIZE):
+    # Resized and JPEG-encoded once per process (and kept on disk across restarts); None if the photo is missing
+    bundle = get_bundle()
+    if bundle is not None and size == LOOK_SIZE:
+        thumbnail = bundle.look_thumbnail(img_path)
+        if thumbnail is not None:
+            return thumbnail
+    source = find_look_image(img_path)
+    if source is None:
         return None
+    stat = os.stat(source)
+    name = f"{os.path.splitext(os.path.basename(source))[0]}-{size[0]}x{size[1]}-{int(stat.st_mtime)}.jpg"
+    path = os.path.join(LOOK_THUMBNAIL_DIR, name)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    with Image.open(source) as image:
+        thumbnail = image.convert('RGB').resize(size)
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, format='JPEG', quality=85)
+
+    os.makedirs(LOOK_THUMBNAIL_DIR, exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(buffer.getvalue())
+    os.replace(path + '.tmp', path)
+    return buffer.getvalue()
+
+
+def build_look_thumbnails():
+    # Deploy-time step: render every gallery thumbnail so no session ever decodes a full-size photo
+    for name, _, img_path in LOOKS.values():
+        thumbnail = look_thumbnail(img_path)
+        print(f"{name}: {'missing' if thumbnail is None else f'{len(thumbnail)} bytes'}")
+
+
+if __name__ == "__main__":
+    build_look_thumbnails()
@@ -0,0 +1,42 @@
+# fetch_models.py
+import argparse
+import os
+import sys
+import urllib.request
+
+MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+# The LBF facemark model trained for opencv_contrib's face module (GSoC 2017 face alignment data)
+LBF_MODEL_URL = "https://raw.githubusercontent.com/kurnianggoro/GSOC2017/master/data/lbfmodel.yaml"
+LBF_MODEL_PATH = os.path.join(MODELS_DIR, 'lbfmodel.yaml')
+
+
+def fetch(url, path, force=False):
+    if os.path.exists(path) and not force:
+        print(f"{path} already present")
+        return path
+    # Downloaded beside the target and renamed into place, so an interrupted fetch never leaves a truncated model
+    with urllib.request.urlopen(url, timeout=120) as response, open(path + '.tmp', 'wb') as f:
+        while chunk := response.read(1 << 20):
+            f.write(chunk)
+    os.replace(path + '.tmp', path)
+    print(f"{os.path.getsize(path) / 2 ** 20:.1f} MB -> {path}")
+    return path
+
+
+def check(path):
+    # Loads the model the way landmarks.py does; needs the contrib build of OpenCV
+    import cv2
+    if not hasattr(cv2, 'face'):
+        print("cv2.face is missing: pip install -r models/requirements.txt", file=sys.stderr)
+        return False
+    cv2.face.createFacemarkLBF().loadModel(path)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download the face landmark model used by landmarks.py")
+    parser.add_argument("--url", default=LBF_MODEL_URL)
+    parser.add_argument("--path", default=LBF_MODEL_PATH)
+    parser.add_argument("--force", action="store_true", help="download even if the file exists")
+    args = parser.parse_args()
+    sys.exit(0 if check(fetch(args.url, args.path, args.force)) else 1)
@@ -0,0 +1,147 @@
+# palette.py
+import math
+import numpy as np
+from color import delta_e
+
+MAKEUP_CATEGORIES = ('foundation', 'blush', 'eyeshadow', 'lipstick')
+
+# Skin lightness (L*) for each luminance bucket of determine_skin_category, taken at the bucket's middle
+SKIN_LIGHTNESS = {'very_light': 86.0, 'light': 77.0, 'light_medium': 69.6, 'medium': 62.1,
+                  'medium_deep': 54.4, 'deep': 46.4, 'very_deep': 34.0}
+# Undertone is read from the skin's Lab hue angle: yellower skin is warm, pinker skin is cool. Centred on the
+# bundled photos, which measure 47-55 degrees; the cut-offs sit halfway between neighbouring anchors
+UNDERTONE_HUES = {'cool': 42.0, 'neutral': 48.0, 'warm': 54.0}
+COOL_BELOW = (UNDERTONE_HUES['cool'] + UNDERTONE_HUES['neutral']) / 2
+WARM_ABOVE = (UNDERTONE_HUES['neutral'] + UNDERTONE_HUES['warm']) / 2
+SKIN_CHROMA = 22.0
+MIN_UNDERTONE_CHROMA = 6.0
+# What a result whose skin colour couldn't be measured is treated as
+DEFAULT_SKIN_CATEGORY, DEFAULT_UNDERTONE = 'medium', 'neutral'
+
+# (category, RGB, skin lightness bucket, undertone) - each colour is anchored at the skin tone it was
+# chosen for; None stands for every bucket or undertone. These are the advisor's shade lists: foundation
+# follows the skin category only, the other categories the undertone only. Suggestions are the colours
+# whose anchors are closest to the measured skin in CIELAB
+PALETTE_TABLE = (
+    ('foundation', (255, 235, 220), 'very_light', None),
+    ('foundation', (255, 233, 215), 'very_light', None),
+    ('foundation', (255, 230, 210), 'very_light', None),
+    ('foundation', (245, 225, 210), 'light', None),
+    ('foundation', (245, 223, 205), 'light', None),
+    ('foundation', (245, 220, 200), 'light', None),
+    ('foundation', (235, 215, 200), 'light_medium', None),
+    ('foundation', (235, 213, 195), 'light_medium', None),
+    ('foundation', (235, 210, 190), 'light_medium', None),
+    ('foundation', (225, 205, 190), 'medium', None),
+    ('foundation', (225, 203, 185), 'medium', None),
+    ('foundation', (225, 200, 180), 'medium', None),
+    ('foundation', (215, 195, 180), 'medium_deep', None),
+    ('foundation', (215, 193, 175), 'medium_deep', None),
+    ('foundation', (215, 190, 170), 'medium_deep', None),
+    ('foundation', (205, 185, 170), 'deep', None),
+    ('foundation', (205, 183, 165), 'deep', None),
+    ('foundation', (205, 180, 160), 'deep', None),
+    ('foundation', (195, 175, 160), 'very_deep', None),
+    ('foundation', (195, 173, 155), 'very_deep', None),
+    ('foundation', (195, 170, 150), 'very_deep', None),
+
+    ('blush', (255, 190, 180), None, 'warm'),
+    ('blush', (255, 150, 130), None, 'warm'),
+    ('blush', (255, 160, 122), None, 'warm'),
+    ('blush', (255, 192, 203), None, 'cool'),
+    ('blush', (255, 182, 193), None, 'cool'),
+    ('blush', (219, 112, 147), None, 'cool'),
+    ('blush', (255, 192, 203), None, 'neutral'),
+    ('blush', (255, 160, 122), None, 'neutral'),
+    ('blush', (255, 228, 225), None, 'neutral'),
+
+    ('eyeshadow', (255, 222, 173), None, 'warm'),
+    ('eyeshadow', (210, 180, 140), None, 'warm'),
+    ('eyeshadow', (188, 143, 143), None, 'warm'),
+    ('eyeshadow', (230, 230, 250), None, 'cool'),
+    ('eyeshadow', (216, 191, 216), None, 'cool'),
+    ('eyeshadow', (221, 160, 221), None, 'cool'),
+    ('eyeshadow', (245, 222, 179), None, 'neutral'),
+    ('eyeshadow', (222, 184, 135), None, 'neutral'),
+    ('eyeshadow', (210, 180, 140), None, 'neutral'),
+
+    ('lipstick', (255, 125, 100), None, 'warm'),
+    ('lipstick', (255, 99, 71), None, 'warm'),
+    ('lipstick', (205, 92, 92), None, 'warm'),
+    ('lipstick', (219, 112, 147), None, 'cool'),
+    ('lipstick', (255, 0, 127), None, 'cool'),
+    ('lipstick', (199, 21, 133), None, 'cool'),
+    ('lipstick', (255, 160, 122), None, 'neutral'),
+    ('lipstick', (205, 92, 92), None, 'neutral'),
+    ('lipstick', (250, 128, 114), None, 'neutral'),
+)
+# Colours tied on distance (anchored at the same skin tone) are ranked in table order
+TABLE_ORDER_STEP = 1e-9
+
+
+def skin_anchor(lightness, undertone):
+    # A representative skin colour in CIELAB for a lightness bucket (or an L* value) and an undertone
+    if isinstance(lightness, str):
+        lightness = SKIN_LIGHTNESS[lightness]
+    hue = math.radians(UNDERTONE_HUES[undertone])
+    return np.array([lightness, SKIN_CHROMA * math.cos(hue), SKIN_CHROMA * math.sin(hue)])
+
+
+def undertone_from_lab(lab):
+    # Hue angle of a skin colour; near-grey measurements (poor lighting) carry no undertone
+    a, b = float(lab[1]), float(lab[2])
+    if math.hypot(a, b) < MIN_UNDERTONE_CHROMA:
+        return 'neutral'
+    hue = math.degrees(math.atan2(b, a))
+    if hue < COOL_BELOW:
+        return 'cool'
+    if hue > WARM_ABOVE:
+        return 'warm'
+    return 'neutral'
+
+
+class PaletteEngine:
+    def __init__(self, table=PALETTE_TABLE, categories=MAKEUP_CATEGORIES):
+        # Packed once: each category's distinct colours, and every colour's skin anchors in Lab, grouped by colour
+        colours, anchors, owners, positions = [], [], [], []
+        self.categories = categories
+        self.ranges = {}
+        for category in categories:
+            start = len(colours)
+            for position, (row_category, rgb, lightness, undertone) in enumerate(table):
+                if row_category != category:
+                    continue
+                if rgb not in colours[start:]:
+                    colours.append(rgb)
+                for bucket in ([lightness] if lightness else SKIN_LIGHTNESS):
+                    for hue in ([undertone] if undertone else UNDERTONE_HUES):
+                        owners.append(colours.index(rgb, start))
+                        anchors.append(skin_anchor(bucket, hue))
+                        positions.append(position)
+            self.ranges[category] = (start, len(colours))
+        order = np.argsort(owners, kind='stable')
+        self.rgb = np.array(colours, dtype=np.uint8)
+        self.anchors = np.stack(anchors)[order]
+        self.tie_breaks = np.array(positions)[order] * TABLE_ORDER_STEP
+        self.owners = np.array(owners)[order]
+        self.anchor_starts = np.searchsorted(self.owners, np.arange(len(colours)))
+
+    def distances(self, skin_labs):
+        # ΔE from each skin colour to each palette colour's closest anchor: (skins, colours)
+        anchor_distances = delta_e(np.asarray(skin_labs, dtype=np.float64).reshape(-1, 3), self.anchors)
+        return np.minimum.reduceat(anchor_distances + self.tie_breaks, self.anchor_starts, axis=1)
+
+    def suggest(self, skin_labs, k=3):
+        # One batched call for any number of skin colours; returns a dict (a list of dicts for a batch)
+        # of each category's k closest colours, nearest first
+        single = np.ndim(skin_labs) == 1
+        distances = self.distances(skin_labs)
+        suggestions = [{} for _ in range(len(distances))]
+        for category, (start, end) in self.ranges.items():
+            nearest = np.argsort(distances[:, start:end], axis=1, kind='stable')[:, :k] + start
+            for suggestion, rows in zip(suggestions, nearest):
+                suggestion[category] = [tuple(colour) for colour in self.rgb[rows].tolist()]
+        return suggestions[0] if single else suggestions
+
+
+DEFAULT_PALETTE = PaletteEngine()
@@ -0,0 +1,40 @@
+# pipeline.py
+MISSING = object()
+
+
+class Pipeline:
+    # Per-session memo of the app's stages, kept in `state` (the session state). A stage reruns when its
+    # inputs differ or a stage listed in `after` has produced a new output since; each run records which
+    # stages executed and which were skipped
+    def __init__(self, state, key='pipeline'):
+        self.memo = state.setdefault(key, {})
+        self.executed = []
+        self.skipped = []
+
+    def _signature(self, inputs, after):
+        return inputs, tuple(self.memo[name]['version'] if name in self.memo else None for name in after)
+
+    def cached(self, name, inputs, after=()):
+        # The stored output if it is still valid for these inputs, else MISSING; never computes
+        entry = self.memo.get(name)
+        if entry is None or entry['signature'] != self._signature(inputs, after):
+            return MISSING
+        self.skipped.append(name)
+        return entry['output']
+
+    def run(self, name, compute, inputs, after=(), force=False):
+        # `force` recomputes even over a valid memo, e.g. when the user explicitly asks again
+        if not force:
+            output = self.cached(name, inputs, after)
+            if output is not MISSING:
+                return output
+        # A stage that raises stores nothing and runs again next time
+        output = compute()
+        previous = self.memo.get(name)
+        self.memo[name] = {'signature': self._signature(inputs, after), 'output': output,
+                           'version': previous['version'] + 1 if previous else 1}
+        self.executed.append(name)
+        return output
+
+    def stats(self):
+        return {"executed": list(self.executed), "skipped": list(self.skipped)}
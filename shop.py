@@ -1,9 +1,53 @@
 # shop.py
+import hashlib
+import io
+import os
 import streamlit as st
-import requests
+from PIL import Image
+from analysis import swatch_html
+from bundles import get_bundle
+from cache import CACHE_DIR, LRUCache
+from catalog import CATALOG_URL, get_catalog, parse_price
+from clients import http_get
+from tracing import span
+
+THUMBNAIL_DIR = os.path.join(CACHE_DIR, 'thumbnails')
+THUMBNAIL_SIZE = (200, 200)
+PAGE_SIZES = [5, 10, 20]
+SORT_OPTIONS = ["Best shade match", "Price: low to high", "Price: high to low"]
+# Thumbnails by image URL; only successful fetches are kept, so a failed one is tried again next time
+thumbnail_cache = LRUCache(maxsize=512)
+# The shop tab's choices; every combination is precomputed by bundles.py
+BRANDS = ['Maybelline', 'Revlon', 'L\'Oreal', 'Dior', 'Covergirl', 'Clinique', 'NYX', 'e.l.f.', 'MAC', 'Fenty Beauty']
+PRODUCT_TYPES = ['lipstick', 'foundation', 'eyeshadow', 'mascara', 'blush', 'bronzer']
+
+
+def catalog_bundle():
+    # The precomputed bundle, as long as its catalog snapshot is no older than the catalog's refresh interval
+    bundle = get_bundle()
+    return bundle if bundle is not None and bundle.catalog_is_fresh() else None
+
 
 def get_makeup_products(brand=None, product_type=None):
-    url = "https://makeup-api.herokuapp.com/api/v1/products.json"
+    # Served from the precomputed bundle or the local catalog; the live API is only a fallback when no catalog can be synced
+    with span("products.fetch", brand=brand, product_type=product_type):
+        bundle = catalog_bundle()
+        products = bundle.products(brand, product_type) if bundle is not None else None
+        if products is not None:
+            return products
+        try:
+            return get_catalog().query(brand=brand, product_type=product_type)
+        except (OSError, ValueError):
+            pass
+        try:
+            return fetch_makeup_products(brand, product_type)
+        except (OSError, ValueError):
+            # Includes an open circuit: the tab shows "No products found" and the button can retry
+            return None
+
+
+def fetch_makeup_products(brand=None, product_type=None):
+    url = CATALOG_URL
     params = {}
 
     if brand:
@@ -11,7 +55,7 @@ def get_makeup_products(brand=None, product_type=None):
     if product_type:
         params["product_type"] = product_type.lower()
 
-    response = requests.get(url, params=params)
+    response = http_get(url, params=params, endpoint='makeup-api', timeout=30)
 
     if response.status_code == 200:
         return response.json()
@@ -19,7 +63,24 @@ def get_makeup_products(brand=None, product_type=None):
         return None
 
 
-def filter_shades(product, skin_category, undertone):
+def shade_index():
+    # The bundle's memory-mapped index when there is one, so ranking doesn't need the catalog in memory
+    bundle = catalog_bundle()
+    index = bundle.shade_index() if bundle is not None else None
+    return index if index is not None else get_catalog().shade_index()
+
+
+def filter_shades(product, skin_category, undertone, skin_tone=None, k=5, max_distance=25):
+    # With a measured skin tone, pick the closest shades by Lab distance from the catalog's shade index
+    if skin_tone is not None and 'id' in product:
+        try:
+            index = shade_index()
+        except (OSError, ValueError):
+            index = None
+        if index is not None and product['id'] in index.ranges:
+            return [dict(shade, delta_e=round(distance, 1))
+                    for shade, distance in index.nearest(skin_tone, k, product['id'], max_distance)]
+
     suitable_shades = []
     for shade in product.get('product_colors', []):
         shade_name = shade.get('colour_name', '').lower()
@@ -30,24 +91,131 @@ def filter_shades(product, skin_category, undertone):
     return suitable_shades
 
 
-def display_recommendations(products, skin_category, undertone):
-    st.write(f"**Recommended products for {skin_category.replace('_', ' ').title()} skin tone and {undertone} undertone:**")
+def get_thumbnail(url):
+    # Fetched only when a product is actually shown, then kept resized on disk and in memory
+    if not url:
+        return None
+    thumbnail = thumbnail_cache.get(url)
+    if thumbnail is None:
+        thumbnail = load_thumbnail(url)
+        if thumbnail is not None:
+            thumbnail_cache.set(url, thumbnail)
+    return thumbnail
+
+
+def load_thumbnail(url):
+    # From the bundle, the disk cache or the image host; None if the image can't be fetched
+    bundle = catalog_bundle()
+    thumbnail = bundle.thumbnail(url) if bundle is not None else None
+    if thumbnail is not None:
+        return thumbnail
+    if url.startswith('//'):
+        url = 'https:' + url
+    path = os.path.join(THUMBNAIL_DIR, hashlib.sha1(url.encode()).hexdigest() + '.jpg')
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    try:
+        with span("products.thumbnail_fetch"):
+            response = http_get(url, endpoint='product-images', retries=0)
+        response.raise_for_status()
+        image = Image.open(io.BytesIO(response.content)).convert('RGB')
+    except (OSError, ValueError):
+        return None
+    image.thumbnail(THUMBNAIL_SIZE)
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=85)
+
+    os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(buffer.getvalue())
+    os.replace(path + '.tmp', path)
+    return buffer.getvalue()
+
+
+def rank_products(products, skin_tone=None, sort=SORT_OPTIONS[0], min_price=None, max_price=None):
+    # Filtering and sorting happen here, before anything is rendered
+    scores = {}
+    if skin_tone is not None:
+        try:
+            scores = shade_index().best_matches(skin_tone)
+        except (OSError, ValueError):
+            scores = {}
+
+    ranked = []
     for product in products:
-        st.write(f"**{product['name']}**")
-        st.write(f"**Brand**: {product['brand'].title()}")
-        st.write(f"**Price**: {product.get('price', 'Not available')}")
-        st.write(f"**Category**: {product.get('category', 'Not available')}")
-        st.write(f"**Product Type**: {product['product_type'].title()}")
-        st.write(f"**Link**: [Product Page]({product['product_link']})")
-        st.image(product.get('image_link', ''))
-
-        suitable_shades = filter_shades(product, skin_category, undertone)
-        if suitable_shades:
-            st.write("**Recommended Shades for Your Skin Tone**:")
-            for shade in suitable_shades:
-                st.write(f"- {shade['colour_name'].title()} ({shade['hex_value']})")
-                st.markdown(f"<div style='background-color:{shade['hex_value']}; width:50px; height:50px;'></div>",
-                            unsafe_allow_html=True)
-        else:
-            st.write("No specific shade recommendations found.")
-        st.write("---")
+        price = parse_price(product.get('price'))
+        if min_price is not None and (price is None or price < min_price):
+            continue
+        if max_price is not None and (price is None or price > max_price):
+            continue
+        ranked.append((product, price, scores.get(product.get('id'))))
+
+    if sort == "Price: low to high":
+        ranked.sort(key=lambda item: (item[1] is None, item[1] or 0))
+    elif sort == "Price: high to low":
+        ranked.sort(key=lambda item: (item[1] is None, -(item[1] or 0)))
+    else:
+        ranked.sort(key=lambda item: (item[2] is None, item[2] or 0))
+    return ranked
+
+
+def display_product(product, skin_category, undertone, skin_tone=None):
+    st.write(f"**{product['name']}**")
+    st.write(f"**Brand**: {product['brand'].title()}")
+    st.write(f"**Price**: {product.get('price', 'Not available')}")
+    st.write(f"**Category**: {product.get('category', 'Not available')}")
+    st.write(f"**Product Type**: {product['product_type'].title()}")
+    st.write(f"**Link**: [Product Page]({product['product_link']})")
+    thumbnail = get_thumbnail(product.get('image_link'))
+    if thumbnail:
+        st.image(thumbnail)
+
+    suitable_shades = filter_shades(product, skin_category, undertone, skin_tone)
+    if suitable_shades:
+        st.write("**Recommended Shades for Your Skin Tone**:")
+        for shade in suitable_shades:
+            match = f" - match ΔE {shade['delta_e']}" if 'delta_e' in shade else ""
+            st.write(f"- {shade['colour_name'].title()} ({shade['hex_value']}){match}")
+            st.markdown(swatch_html(shade['hex_value']), unsafe_allow_html=True)
+    else:
+        st.write("No specific shade recommendations found.")
+    st.write("---")
+
+
+def display_recommendations(products, skin_category, undertone, skin_tone=None, pipeline=None):
+    st.write(f"**Recommended products for {skin_category.replace('_', ' ').title()} skin tone and {undertone} undertone:**")
+
+    prices = [price for price in (parse_price(p.get('price')) for p in products) if price is not None]
+    col1, col2, col3 = st.columns(3)
+    sort = col1.selectbox("Sort by", SORT_OPTIONS if skin_tone is not None else SORT_OPTIONS[1:])
+    page_size = col2.selectbox("Products per page", PAGE_SIZES, index=1)
+    min_price = max_price = None
+    if prices and min(prices) < max(prices):
+        selected = col3.slider("Price range", min(prices), max(prices), (min(prices), max(prices)))
+        # The full span means "no filter": unpriced products stay listed (sorted last) until the range is narrowed
+        if selected != (min(prices), max(prices)):
+            min_price, max_price = selected
+
+    def rank():
+        with span("products.rank", count=len(products)):
+            return rank_products(products, skin_tone, sort, min_price, max_price)
+
+    # Paging reruns reuse the ranking; it is redone only when the products or a filter change
+    if pipeline is None:
+        ranked = rank()
+    else:
+        ranked = pipeline.run("shop_rank", rank, {"skin_tone": skin_tone, "sort": sort, "min_price": min_price,
+                                                  "max_price": max_price}, after=("shop",))
+    if not ranked:
+        st.write("No products match these filters.")
+        return
+
+    # Only the current page is rendered, however many products matched
+    pages = (len(ranked) + page_size - 1) // page_size
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+    start = (page - 1) * page_size
+    st.caption(f"Showing {start + 1}-{min(start + page_size, len(ranked))} of {len(ranked)} products")
+    for product, _, _ in ranked[start:start + page_size]:
+        display_product(product, skin_category, undertone, skin_tone)
@@ -0,0 +1,209 @@
+# stubs.py
+import io
+import json
+import random
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from PIL import Image
+
+TUTORIAL_STEPS = ["Skin Preparation", "Foundation and Concealer", "Eyes", "Cheeks", "Lips", "Final Touches"]
+SEASONAL_ANSWERS = {
+    "warm": "Warm undertones glow in the Spring and Autumn palettes: golden peach, coral and terracotta.",
+    "cool": "Cool undertones suit the Summer and Winter palettes: soft rose, icy blue and crisp white.",
+    "neutral": "Neutral undertones can wear Spring, Summer, Autumn and Winter shades in moderation.",
+}
+BRANDS = ['maybelline', 'revlon', "l'oreal", 'dior', 'covergirl', 'clinique', 'nyx', 'e.l.f.', 'mac', 'fenty beauty']
+PRODUCT_TYPES = ['lipstick', 'foundation', 'eyeshadow', 'mascara', 'blush', 'bronzer']
+CATEGORIES = ['liquid', 'powder', 'cream', 'pencil', None]
+SHADE_NAMES = ['fair', 'light', 'medium', 'deep', 'warm beige', 'cool ivory', 'neutral sand', 'universal glow',
+               'rose', 'nude']
+
+
+def synthetic_products(count=1000, seed=0, base_url=""):
+    # Same seed, same catalog: products shaped like the makeup API's, with 0-20 shades each
+    rng = random.Random(seed)
+    products = []
+    for product_id in range(1, count + 1):
+        price = None if rng.random() < 0.1 else f"{rng.uniform(3, 60):.2f}"
+        products.append({
+            'id': product_id,
+            'brand': rng.choice(BRANDS),
+            'name': f"Product {product_id}",
+            'price': price,
+            'price_sign': '$',
+            'currency': 'USD',
+            'image_link': f"{base_url}/images/{product_id}.jpg",
+            'product_link': f"{base_url}/products/{product_id}",
+            'rating': round(rng.uniform(1, 5), 1),
+            'category': rng.choice(CATEGORIES),
+            'product_type': rng.choice(PRODUCT_TYPES),
+            'tag_list': [],
+            'updated_at': '2024-01-01T00:00:00Z',
+            'product_colors': [{'hex_value': '#%02x%02x%02x' % tuple(rng.randrange(256) for _ in range(3)),
+                                'colour_name': rng.choice(SHADE_NAMES)} for _ in range(rng.randrange(21))],
+        })
+    return products
+
+
+def tutorial_text(skin_tone="Medium", occasion="Everyday"):
+    sections = [f"{i}. {step}\nA short explanation of the {step.lower()} step for {skin_tone} skin.\n"
+                f"[YouTube Search: {step} tutorial {skin_tone} skin {occasion}]"
+                for i, step in enumerate(TUTORIAL_STEPS, 1)]
+    return "Here is your tutorial.\n\n" + "\n\n".join(sections)
+
+
+class StubUpstreams:
+    # Local stand-ins for OpenAI, YouTube, the makeup API and product images. Every response waits
+    # `latency` seconds first; `requests` counts calls per upstream
+    def __init__(self, latency=0.05, products=1000, seed=0, chunk_delay=0.002):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.requests = {}
+        # Per-query YouTube overrides: extra seconds before answering, or an HTTP error status instead of a result
+        self.youtube_delays = {}
+        self.youtube_errors = {}
+        # Requests being served right now, and the most ever served at once, per upstream
+        self.active = {}
+        self.peak = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self.products = synthetic_products(products, seed, self.url)
+        self._thread = None
+
+    def env(self):
+        # Environment that points the app's clients at this server
+        return {
+            'OPENAI_API_KEY': 'stub',
+            'OPENAI_BASE_URL': f"{self.url}/v1",
+            'YOUTUBE_API_KEY': 'stub',
+            'YOUTUBE_API_ENDPOINT': self.url,
+            'MAKEUP_API_URL': f"{self.url}/api/v1/products.json",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, upstream):
+        with self._lock:
+            self.requests[upstream] = self.requests.get(upstream, 0) + 1
+
+    @contextmanager
+    def _serving(self, upstream):
+        with self._lock:
+            self.active[upstream] = self.active.get(upstream, 0) + 1
+            self.peak[upstream] = max(self.peak.get(upstream, 0), self.active[upstream])
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active[upstream] -= 1
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if url.path.startswith('/youtube/v3/search'):
+                    with stub._serving('youtube'):
+                        self.youtube_search(query.get('q', ''))
+                    return
+                time.sleep(stub.latency)
+                if url.path == '/api/v1/products.json':
+                    stub._count('makeup-api')
+                    products = [p for p in stub.products
+                                if query.get('brand') in (None, p['brand'])
+                                and query.get('product_type') in (None, p['product_type'])]
+                    self.send_json(products)
+                elif url.path.startswith('/images/'):
+                    stub._count('product-images')
+                    buffer = io.BytesIO()
+                    Image.new('RGB', (600, 600), (200, 150, 140)).save(buffer, format='JPEG')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'image/jpeg')
+                    self.send_header('Content-Length', str(buffer.tell()))
+                    self.end_headers()
+                    self.wfile.write(buffer.getvalue())
+                else:
+                    self.send_json({'error': 'not found'}, 404)
+
+            def youtube_search(self, q):
+                stub._count('youtube')
+                time.sleep(stub.latency + stub.youtube_delays.get(q, 0))
+                status = stub.youtube_errors.get(q)
+                if status is not None:
+                    self.send_json({'error': {'code': status, 'message': f"Stub error for {q}"}}, status)
+                    return
+                video_id = '%011d' % zlib.crc32(q.encode())
+                self.send_json({'items': [{'id': {'kind': 'youtube#video', 'videoId': video_id},
+                                           'snippet': {'title': f"Stub video: {q}"}}]})
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                time.sleep(stub.latency)
+                if self.path != '/v1/chat/completions':
+                    self.send_json({'error': {'message': 'not found'}}, 404)
+                    return
+                stub._count('openai')
+                prompt = request['messages'][-1]['content']
+                text = SEASONAL_ANSWERS.get(prompt.strip()) or tutorial_text()
+                if request.get('stream'):
+                    self.stream(request['model'], text)
+                else:
+                    self.send_json({'id': 'stub', 'object': 'chat.completion', 'created': int(time.time()),
+                                    'model': request['model'],
+                                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                                 'message': {'role': 'assistant', 'content': text}}],
+                                    'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}})
+
+            def stream(self, model, text):
+                # Server-sent events, a few words per chunk, like the real streaming API
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                words = text.split(' ')
+                for start in range(0, len(words), 4):
+                    piece = ' '.join(words[start:start + 4]) + (' ' if start + 4 < len(words) else '')
+                    chunk = {'id': 'stub', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                             'model': model, 'choices': [{'index': 0, 'delta': {'content': piece},
+                                                          'finish_reason': None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(stub.chunk_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        return Handler
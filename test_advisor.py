@@ -0,0 +1,22 @@
+# test_advisor.py
+import tracemalloc
+import numpy as np
+from advisor import ComprehensiveMakeupAdvisor
+
+
+def test_image_key_hashes_the_pixels_without_copying_them():
+    advisor = ComprehensiveMakeupAdvisor(cache_size=0, use_landmarks=False)
+    pixels = np.zeros((2048, 2048, 3), dtype=np.uint8)
+    pixels.flags.writeable = False
+    tracemalloc.start()
+    try:
+        key = advisor.image_key(pixels)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < pixels.nbytes // 100
+
+    changed = pixels.copy()
+    changed[-1, -1, -1] = 1
+    assert advisor.image_key(changed) != key
+    assert advisor.image_key(pixels.copy()) == key
@@ -0,0 +1,27 @@
+# test_batch.py
+import pyarrow.parquet as pq
+from batch import ParquetWriter
+
+OK_ROW = {"path": "b.jpg", "status": "ok", "message": "Success", "skin_tone": [198, 156, 128],
+          "skin_category": "medium", "undertone": "warm", "face_shape": "Oval", "eye_color": "Brown"}
+
+
+def test_parquet_parts_keep_analysis_columns(tmp_path):
+    output = str(tmp_path / "results.parquet")
+    writer = ParquetWriter(output, append=False, rows_per_part=3)
+    # The first part starts with a row without a face; the second has no analysed row at all
+    writer.write({"path": "a.jpg", "status": "no_face", "message": "No face detected"})
+    writer.write(OK_ROW)
+    writer.write(dict(OK_ROW, path="c.jpg"))
+    writer.write({"path": "d.jpg", "status": "error", "message": "cannot identify image file"})
+    writer.close()
+
+    parts = sorted(tmp_path.glob("results.parquet/part-*.parquet"))
+    assert len(parts) == 2
+    tables = [pq.read_table(part) for part in parts]
+    assert tables[0].schema == tables[1].schema == ParquetWriter.schema()
+
+    rows = tables[0].to_pylist()
+    assert rows[0]["skin_tone"] is None and rows[0]["face_shape"] is None
+    assert rows[1] == OK_ROW
+    assert ParquetWriter.completed(output) == {"a.jpg", "b.jpg", "c.jpg", "d.jpg"}
@@ -0,0 +1,39 @@
+# test_bundles.py
+import time
+import numpy as np
+import bundles
+import palette
+from bundles import BundleWriter, RecommendationBundle
+
+
+def write_bundle(path, synced_at):
+    writer = BundleWriter()
+    writer.add_json('products/nyx/lipstick', [{'id': 1, 'price': '4.0'}])
+    writer.add('swatch/autumn', b'png bytes')
+    writer.add_array('shades/lab', np.arange(6, dtype=np.float32).reshape(2, 3))
+    writer.write(str(path), {'fingerprint': bundles.source_fingerprint(), 'built_at': time.time(),
+                             'catalog_synced_at': synced_at})
+    return RecommendationBundle(str(path))
+
+
+def test_entries_round_trip_through_the_mapping(tmp_path):
+    bundle = write_bundle(tmp_path / 'bundles.bin', time.time())
+    assert bundle.products('NYX', 'lipstick') == [{'id': 1, 'price': '4.0'}]
+    assert bundle.swatch('autumn') == b'png bytes'
+    lab = bundle.read_array('shades/lab')
+    assert lab.tolist() == [[0, 1, 2], [3, 4, 5]] and not lab.flags.writeable
+    assert bundle.products('dior', 'lipstick') is None
+
+
+def test_catalog_entries_expire_with_the_catalog(tmp_path):
+    assert write_bundle(tmp_path / 'fresh.bin', time.time()).catalog_is_fresh()
+    assert not write_bundle(tmp_path / 'old.bin', time.time() - 2 * bundles.CATALOG_MAX_AGE).catalog_is_fresh()
+
+
+def test_fingerprint_covers_the_skin_anchors(monkeypatch):
+    before = bundles.source_fingerprint()
+    monkeypatch.setattr(palette, 'SKIN_CHROMA', palette.SKIN_CHROMA + 1)
+    assert bundles.source_fingerprint() != before
+    monkeypatch.undo()
+    monkeypatch.setitem(palette.SKIN_LIGHTNESS, 'medium', 60.0)
+    assert bundles.source_fingerprint() != before
@@ -0,0 +1,135 @@
+# test_catalog.py
+import json
+import threading
+import pytest
+import catalog
+import shop
+from catalog import ProductCatalog
+from clients import CircuitOpenError
+
+
+@pytest.fixture
+def unsynced(monkeypatch):
+    # No catalog on disk, and every download fails
+    syncs = []
+
+    def sync(self, source=None):
+        syncs.append(threading.current_thread() is threading.main_thread())
+        raise OSError("upstream down")
+
+    monkeypatch.setattr(catalog, '_catalog', None)
+    monkeypatch.setattr(ProductCatalog, 'load', lambda self: False)
+    monkeypatch.setattr(ProductCatalog, 'sync', sync)
+    return syncs
+
+
+def wait_for_refresh():
+    for thread in threading.enumerate():
+        if thread.name == "catalog-refresh":
+            thread.join(timeout=1)
+
+
+def test_failed_sync_is_retried_only_after_the_cooldown(unsynced, monkeypatch):
+    for _ in range(5):
+        with pytest.raises(OSError):
+            catalog.get_catalog()
+        wait_for_refresh()
+    # One background attempt, never on the calling thread, then nothing until the retry interval has passed
+    assert unsynced == [False]
+
+    monkeypatch.setattr(catalog._catalog, 'failed_at', catalog._catalog.failed_at - catalog.SYNC_RETRY_INTERVAL - 1)
+    with pytest.raises(OSError):
+        catalog.get_catalog()
+    wait_for_refresh()
+    assert unsynced == [False, False]
+
+
+def test_products_fall_back_quietly_when_the_circuit_is_open(unsynced, monkeypatch):
+    def open_circuit(*args, **kwargs):
+        raise CircuitOpenError("makeup-api circuit is open")
+
+    monkeypatch.setattr(shop, 'catalog_bundle', lambda: None)
+    monkeypatch.setattr(shop, 'http_get', open_circuit)
+    assert shop.get_makeup_products('NYX', 'lipstick') is None
+
+
+def product(product_id, brand, product_type, price, category=None, updated_at='2024-01-01T00:00:00Z'):
+    return {'id': product_id, 'brand': brand, 'name': f"Product {product_id}", 'price': price, 'category': category,
+            'product_type': product_type, 'product_colors': [{'hex_value': '#c08070', 'colour_name': 'rose'}],
+            'updated_at': updated_at, 'description': 'not stored'}
+
+
+DUMP = [
+    product(1, 'nyx', 'lipstick', '6.0', 'cream'),
+    product(2, 'nyx', 'blush', '9.5', 'powder'),
+    product(3, 'Maybelline', 'lipstick', '12.0', 'liquid'),
+    product(4, 'maybelline', 'lipstick', None),
+    product(5, 'dior', 'foundation', '52.0', 'liquid'),
+]
+
+
+@pytest.fixture
+def dump(tmp_path):
+    # Write a dump where sync() reads it, as the makeup API's JSON would arrive
+    def write(products):
+        path = tmp_path / 'products.json'
+        path.write_text(json.dumps(products))
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def synced(tmp_path, dump):
+    fresh = ProductCatalog(path=str(tmp_path / 'catalog.json.gz'))
+    assert fresh.sync(dump(DUMP)) == {'added': 5, 'updated': 0, 'removed': 0}
+    return fresh
+
+
+def ids(products):
+    return [p['id'] for p in products]
+
+
+def test_sync_applies_only_what_changed(synced, dump):
+    version = synced.version
+    assert synced.sync(dump(DUMP)) == {'added': 0, 'updated': 0, 'removed': 0}
+    assert synced.version == version
+
+    changed = [p for p in DUMP if p['id'] != 2]
+    changed[0] = dict(changed[0], price='7.0', updated_at='2024-02-01T00:00:00Z')
+    changed.append(product(6, 'nyx', 'lipstick', '4.0', 'pencil'))
+    assert synced.sync(dump(changed)) == {'added': 1, 'updated': 1, 'removed': 1}
+    assert synced.version == version + 1
+    assert synced.products[1]['price'] == '7.0' and 2 not in synced.products
+    # Only the stored fields are kept
+    assert 'description' not in synced.products[1]
+    # The removed product has left every index, the new one is in them
+    assert ids(synced.query(brand='nyx')) == [1, 6]
+    assert synced.query(product_type='blush') == []
+
+
+def test_indexed_queries_intersect_case_insensitively(synced):
+    assert ids(synced.query(brand='MAYBELLINE')) == [3, 4]
+    assert ids(synced.query(product_type='lipstick')) == [1, 3, 4]
+    assert ids(synced.query(brand='nyx', product_type='lipstick')) == [1]
+    assert ids(synced.query(category='liquid')) == [3, 5]
+    assert ids(synced.query(brand='dior', product_type='lipstick')) == []
+    assert ids(synced.query(brand='unknown')) == []
+    assert ids(synced.query()) == [1, 2, 3, 4, 5]
+
+
+def test_price_range_is_inclusive_and_skips_unpriced(synced):
+    assert ids(synced.query(min_price=6.0, max_price=12.0)) == [1, 2, 3]
+    assert ids(synced.query(min_price=10)) == [3, 5]
+    assert ids(synced.query(max_price=6.0)) == [1]
+    assert ids(synced.query(product_type='lipstick', min_price=0)) == [1, 3]
+    assert ids(synced.query(min_price=60)) == []
+
+
+def test_a_reloaded_catalog_matches_the_synced_one(synced):
+    reloaded = ProductCatalog(path=synced.path)
+    assert reloaded.load()
+    assert reloaded.products == synced.products
+    assert reloaded.synced_at == synced.synced_at and not reloaded.is_stale()
+    assert reloaded.prices == synced.prices
+    assert ids(reloaded.query(brand='nyx', max_price=10)) == [1, 2]
+    assert len(reloaded.shade_index()) == 5
@@ -0,0 +1,48 @@
+# test_ingest.py
+import io
+import pytest
+from PIL import Image
+from ingest import MAX_SIDE, SESSION_MEMORY_BUDGET, MemoryBudget, UploadRejected, decode_image, process_budget
+
+
+def encoded(image, format='PNG'):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format)
+    buffer.seek(0)
+    return buffer
+
+
+def test_large_png_is_decoded_down_to_the_target():
+    pixels = decode_image(encoded(Image.new('RGB', (6000, 4000), (200, 150, 140))))
+    assert pixels.shape == (1365, MAX_SIDE, 3)
+    assert pixels.flags.c_contiguous and not pixels.flags.writeable
+    assert process_budget.stats()['used'] == 0
+
+
+def test_transparency_is_flattened_onto_white():
+    pixels = decode_image(encoded(Image.new('RGBA', (40, 30), (255, 0, 0, 0))))
+    assert pixels.shape == (30, 40, 3) and pixels[0, 0].tolist() == [255, 255, 255]
+
+
+def test_held_output_is_replaced_not_accumulated():
+    budget = MemoryBudget(100)
+    budget.hold("decode", 60)
+    budget.hold("decode", 80)
+    assert budget.stats()['used'] == 80
+    with pytest.raises(UploadRejected):
+        budget.hold("other", 30)
+    # A rejected hold leaves the previous charge in place
+    assert budget.held == {"decode": 80}
+    budget.release("decode")
+    assert budget.stats()['used'] == 0
+
+
+def test_a_session_keeping_an_image_refuses_a_large_video():
+    budget = MemoryBudget(SESSION_MEMORY_BUDGET)
+    budget.hold("upload", 20 * 2 ** 20)
+    budget.hold("decode", MAX_SIDE * MAX_SIDE * 3)
+    # A video replaces the image's upload, but counts twice: the uploader's copy and the player's
+    with pytest.raises(UploadRejected):
+        budget.hold("upload", 2 * 30 * 2 ** 20)
+    budget.hold("upload", 2 * 20 * 2 ** 20)
+    assert budget.stats()['used'] == 40 * 2 ** 20 + MAX_SIDE * MAX_SIDE * 3
@@ -0,0 +1,118 @@
+# test_landmarks.py
+import math
+import numpy as np
+import pytest
+import advisor
+from landmarks import (LEFT_CHEEK, LEFT_EYE, OVAL_MAX_WIDTH_RATIO, RIGHT_CHEEK, RIGHT_EYE, SQUARE_MIN_JAW_RATIO,
+                       face_proportions, landmark_face_shape, landmark_iris_color, region_mask)
+
+CENTER_X, BROW_Y, HALF_CHEEK = 200.0, 120.0, 80.0
+# Contour from temple (0) to chin (8): height below the brow line as a fraction of brow-to-chin, and half-width
+CONTOUR_HEIGHTS = (0.12, 0.25, 0.38, 0.5, 0.62, 0.75, 0.86, 0.95, 1.0)
+EYE_ANGLES = (180, 120, 60, 0, 300, 240)
+MOUTH_ANGLES = tuple(range(180, -1, -30)) + tuple(range(330, 180, -30))
+
+
+def ellipse(center, rx, ry, angles):
+    return [(center[0] + rx * math.cos(math.radians(a)), center[1] - ry * math.sin(math.radians(a))) for a in angles]
+
+
+def face_layout(width_ratio, jaw_ratio, eye_size=1.0):
+    # A frontal 68-point iBUG layout with the given cheek width / face length and jaw / cheek width
+    chin_to_brow = 2 * HALF_CHEEK / width_ratio / 1.5
+    jaw = jaw_ratio * HALF_CHEEK
+    half_widths = (HALF_CHEEK, HALF_CHEEK, HALF_CHEEK * 0.98, (HALF_CHEEK + jaw) / 2, jaw,
+                   jaw * 0.8, jaw * 0.55, jaw * 0.28, 0.0)
+    points = np.zeros((68, 2), dtype=np.float32)
+    for i, (height, half_width) in enumerate(zip(CONTOUR_HEIGHTS, half_widths)):
+        y = BROW_Y + height * chin_to_brow
+        points[i] = (CENTER_X - half_width, y)
+        points[16 - i] = (CENTER_X + half_width, y)
+    for i in range(5):
+        offset = HALF_CHEEK * (0.75 - 0.15 * i)
+        points[17 + i] = (CENTER_X - offset, BROW_Y)
+        points[26 - i] = (CENTER_X + offset, BROW_Y)
+    for i in range(4):
+        points[27 + i] = (CENTER_X, BROW_Y + (0.1 + 0.08 * i) * chin_to_brow)
+    for i in range(5):
+        points[31 + i] = (CENTER_X + HALF_CHEEK * (0.1 * i - 0.2), BROW_Y + 0.4 * chin_to_brow)
+    eye_y = BROW_Y + 0.15 * chin_to_brow
+    points[RIGHT_EYE] = ellipse((CENTER_X - 0.45 * HALF_CHEEK, eye_y), 18 * eye_size, 9 * eye_size, EYE_ANGLES)
+    points[LEFT_EYE] = ellipse((CENTER_X + 0.45 * HALF_CHEEK, eye_y), 18 * eye_size, 9 * eye_size, EYE_ANGLES)
+    mouth = (CENTER_X, BROW_Y + 0.72 * chin_to_brow)
+    points[48:60] = ellipse(mouth, 0.35 * HALF_CHEEK, 10, MOUTH_ANGLES)
+    points[60:68] = ellipse(mouth, 0.25 * HALF_CHEEK, 4, (180, 135, 90, 45, 0, 315, 270, 225))
+    return points
+
+
+@pytest.mark.parametrize("width_ratio, jaw_ratio, shape", [
+    (0.68, 0.80, "Oval"),
+    (0.85, 0.92, "Square"),
+    (0.88, 0.80, "Round"),
+    # Looks exist for three shapes; a heart face (wide cheekbones over a narrow jaw) is grouped with round
+    (0.82, 0.62, "Round"),
+    # Long faces read as oval whatever the jaw
+    (0.66, 0.95, "Oval"),
+])
+def test_face_shape_from_synthetic_layouts(width_ratio, jaw_ratio, shape):
+    points = face_layout(width_ratio, jaw_ratio)
+    assert face_proportions(points) == pytest.approx((width_ratio, jaw_ratio), abs=1e-4)
+    assert landmark_face_shape(points) == shape
+
+
+def test_thresholds_sit_between_the_shapes():
+    assert landmark_face_shape(face_layout(OVAL_MAX_WIDTH_RATIO - 0.01, 0.8)) == "Oval"
+    assert landmark_face_shape(face_layout(OVAL_MAX_WIDTH_RATIO + 0.01, SQUARE_MIN_JAW_RATIO - 0.01)) == "Round"
+    assert landmark_face_shape(face_layout(OVAL_MAX_WIDTH_RATIO + 0.01, SQUARE_MIN_JAW_RATIO + 0.01)) == "Square"
+
+
+def test_cheek_mask_covers_the_cheeks_and_not_the_eyes():
+    points = face_layout(0.7, 0.8)
+    mask = region_mask((400, 400, 3), points, [RIGHT_CHEEK, LEFT_CHEEK])
+    for side in (RIGHT_CHEEK, LEFT_CHEEK):
+        x, y = points[side].mean(axis=0).astype(int)
+        assert mask[y, x] == 255
+    for eye in (RIGHT_EYE, LEFT_EYE):
+        x, y = points[eye].mean(axis=0).astype(int)
+        assert mask[y, x] == 0
+    assert mask[int(BROW_Y) - 20, int(CENTER_X)] == 0
+
+    # The same mask for a crop, with landmarks still in full-image coordinates
+    crop = region_mask((300, 300, 3), points, [RIGHT_CHEEK, LEFT_CHEEK], offset=(50, 40))
+    assert np.array_equal(crop, mask[40:340, 50:350])
+
+
+def painted_eyes(points, iris_bgr):
+    # White sclera, a large iris and a small black pupil in each eye
+    face = np.full((400, 400, 3), 255, dtype=np.uint8)
+    yy, xx = np.mgrid[:400, :400]
+    for eye in (RIGHT_EYE, LEFT_EYE):
+        x, y = points[eye].mean(axis=0)
+        distance = np.hypot(xx - x, yy - y)
+        face[distance < 10] = iris_bgr
+        face[distance < 2.5] = 0
+    return face
+
+
+@pytest.mark.parametrize("iris_bgr, color", [((30, 60, 110), "Brown"), ((160, 120, 60), "Blue/Green"),
+                                             ((90, 140, 70), "Blue/Green")])
+def test_iris_color_is_read_inside_the_eyelids(iris_bgr, color):
+    points = face_layout(0.7, 0.8)
+    assert landmark_iris_color(painted_eyes(points, iris_bgr), points) == color
+    # A crop of the face gives the same answer once the offset is applied
+    crop = painted_eyes(points, iris_bgr)[50:, 30:]
+    assert landmark_iris_color(crop, points, offset=(30, 50)) == color
+
+
+def test_closed_eyes_are_undetected():
+    points = face_layout(0.7, 0.8, eye_size=0.05)
+    assert landmark_iris_color(painted_eyes(points, (30, 60, 110)), points) == "Unable to detect"
+
+
+def test_landmarks_are_opt_in(monkeypatch):
+    class InstalledModel:
+        available = True
+
+    monkeypatch.setattr(advisor, 'LandmarkEngine', InstalledModel)
+    assert advisor.ComprehensiveMakeupAdvisor(cache_size=0).landmarks is None
+    assert isinstance(advisor.ComprehensiveMakeupAdvisor(cache_size=0, use_landmarks=True).landmarks, InstalledModel)
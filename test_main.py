@@ -0,0 +1,52 @@
+# test_main.py
+import advisor
+import main
+
+UNMEASURED = {"skin_tone": None, "skin_category": None, "undertone": None, "face_shape": "Oval",
+              "eye_color": "Unable to detect"}
+
+
+def render_unmeasured():
+    from advisor import ComprehensiveMakeupAdvisor
+    from main import show_results
+    from test_main import UNMEASURED
+    show_results(ComprehensiveMakeupAdvisor(cache_size=0, use_landmarks=False), dict(UNMEASURED))
+
+
+class ColorsBundle:
+    def __init__(self):
+        self.lookups = []
+
+    def makeup_colors(self, skin_category, undertone):
+        self.lookups.append((skin_category, undertone))
+        return {"blush": [(255, 160, 122)]}
+
+
+def test_a_face_without_measured_skin_gets_the_default_skin_advice(monkeypatch):
+    from streamlit.testing.v1 import AppTest
+    undertones = []
+
+    def seasonal_palette(undertone):
+        undertones.append(undertone)
+        return {"analysis": "Stub analysis", "palettes": {}}
+
+    monkeypatch.setattr(main, 'get_seasonal_palette', seasonal_palette)
+    app = AppTest.from_function(render_unmeasured).run(timeout=30)
+    assert not app.exception
+    assert "Skin Tone: Unable to detect" in [element.value for element in app.markdown]
+    assert any("couldn't be measured" in element.value for element in app.warning)
+    assert undertones == ["neutral"]
+    # The makeup shades tab still shows a swatch per category
+    assert [element.value for element in app.markdown if element.value.startswith("#### ")] == \
+        ["#### Foundation", "#### Blush", "#### Eyeshadow", "#### Lipstick"]
+
+
+def test_unmeasured_makeup_shades_come_from_the_bundle(monkeypatch):
+    from streamlit.testing.v1 import AppTest
+    bundle = ColorsBundle()
+    monkeypatch.setattr(main, 'get_seasonal_palette', lambda undertone: {"analysis": "", "palettes": {}})
+    monkeypatch.setattr(advisor, 'get_bundle', lambda: bundle)
+    app = AppTest.from_function(render_unmeasured).run(timeout=30)
+    assert not app.exception
+    assert bundle.lookups == [("medium", "neutral")]
+    assert [element.value for element in app.markdown if element.value.startswith("#### ")] == ["#### Blush"]
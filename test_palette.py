@@ -0,0 +1,46 @@
+# test_palette.py
+import math
+import numpy as np
+import pytest
+from palette import (DEFAULT_PALETTE, MIN_UNDERTONE_CHROMA, PALETTE_TABLE, SKIN_LIGHTNESS, UNDERTONE_HUES, WARM_ABOVE,
+                     skin_anchor, undertone_from_lab)
+
+
+def shades(category, lightness=None, undertone=None):
+    # One of the advisor's shade lists, read back from the table in order
+    return [rgb for row_category, rgb, row_lightness, row_undertone in PALETTE_TABLE
+            if row_category == category and row_lightness == lightness and row_undertone == undertone]
+
+
+@pytest.mark.parametrize("lightness", list(SKIN_LIGHTNESS))
+@pytest.mark.parametrize("undertone", list(UNDERTONE_HUES))
+def test_anchor_skins_get_the_shade_lists(lightness, undertone):
+    suggestions = DEFAULT_PALETTE.suggest(skin_anchor(lightness, undertone))
+    assert suggestions['foundation'] == shades('foundation', lightness=lightness)
+    for category in ('blush', 'eyeshadow', 'lipstick'):
+        assert suggestions[category] == shades(category, undertone=undertone)
+
+
+def test_warm_skins_never_get_cool_only_colours():
+    rng = np.random.default_rng(0)
+    hues = np.radians(rng.uniform(WARM_ABOVE + 0.01, 80, 500))
+    chromas = rng.uniform(MIN_UNDERTONE_CHROMA, 45, 500)
+    labs = np.stack([rng.uniform(25, 92, 500), chromas * np.cos(hues), chromas * np.sin(hues)], axis=1)
+    assert {undertone_from_lab(lab) for lab in labs} == {'warm'}
+    for suggestions in DEFAULT_PALETTE.suggest(labs):
+        for category in ('blush', 'eyeshadow', 'lipstick'):
+            cool_only = set(shades(category, undertone='cool')) - set(shades(category, undertone='warm'))
+            assert suggestions[category] == shades(category, undertone='warm')
+            assert not cool_only & set(suggestions[category])
+
+
+def test_foundation_follows_the_skin_lightness_only():
+    for lightness, value in SKIN_LIGHTNESS.items():
+        for hue in (30, WARM_ABOVE, 70):
+            lab = (value, 20 * math.cos(math.radians(hue)), 20 * math.sin(math.radians(hue)))
+            assert DEFAULT_PALETTE.suggest(lab)['foundation'] == shades('foundation', lightness=lightness)
+
+
+def test_batch_matches_single_suggestions():
+    labs = np.stack([skin_anchor(lightness, undertone) for lightness in SKIN_LIGHTNESS for undertone in UNDERTONE_HUES])
+    assert DEFAULT_PALETTE.suggest(labs) == [DEFAULT_PALETTE.suggest(lab) for lab in labs]
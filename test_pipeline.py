@@ -0,0 +1,28 @@
+# test_pipeline.py
+from pipeline import MISSING, Pipeline
+
+
+def test_stages_rerun_only_when_inputs_or_upstream_change():
+    state, calls = {}, []
+
+    def rerun(image, undertone):
+        pipeline = Pipeline(state)
+        pipeline.run("decode", lambda: calls.append("decode") or image, {"file": image})
+        pipeline.run("palette", lambda: calls.append("palette") or undertone, {"undertone": undertone},
+                     after=("decode",))
+        return pipeline
+
+    assert rerun("a", "warm").executed == ["decode", "palette"]
+    assert rerun("a", "warm").skipped == ["decode", "palette"]
+    assert rerun("a", "cool").executed == ["palette"]
+    assert rerun("b", "cool").executed == ["decode", "palette"]
+    assert calls == ["decode", "palette", "palette", "decode", "palette"]
+
+
+def test_force_recomputes_a_memoized_stage():
+    state = {}
+    results = iter([None, ["lipstick"]])
+    assert Pipeline(state).run("shop", lambda: next(results), {"brand": "nyx"}) is None
+    assert Pipeline(state).cached("shop", {"brand": "nyx"}) is None
+    assert Pipeline(state).run("shop", lambda: next(results), {"brand": "nyx"}, force=True) == ["lipstick"]
+    assert Pipeline(state).cached("shop", {"brand": "dior"}) is MISSING
@@ -0,0 +1,66 @@
+# test_shop.py
+import io
+from PIL import Image
+import shop
+from cache import LRUCache
+from shop import rank_products
+
+PRODUCTS = [{"id": 1, "price": "12.0"}, {"id": 2, "price": None}, {"id": 3, "price": "5.5"}]
+
+
+def test_unpriced_products_are_kept_and_sorted_last_without_a_price_filter():
+    for sort in ("Price: low to high", "Price: high to low"):
+        ranked = rank_products(PRODUCTS, sort=sort)
+        assert [product["id"] for product, _, _ in ranked][-1] == 2
+        assert len(ranked) == 3
+
+
+def test_a_narrowed_price_range_drops_unpriced_products():
+    ranked = rank_products(PRODUCTS, sort="Price: low to high", min_price=5.0, max_price=10.0)
+    assert [product["id"] for product, _, _ in ranked] == [3]
+
+
+def render_recommendations():
+    from shop import display_recommendations
+    products = [{"id": i, "name": f"Product {i}", "brand": "nyx", "product_type": "lipstick", "price": price,
+                 "product_link": "", "image_link": None, "product_colors": []}
+                for i, price in ((1, "12.0"), (2, None), (3, "5.5"))]
+    display_recommendations(products, "medium", "warm")
+
+
+def test_untouched_price_slider_keeps_unpriced_products():
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_function(render_recommendations).run()
+    assert not app.exception
+    assert any("Showing 1-3 of 3 products" in caption.value for caption in app.caption)
+
+
+class ImageResponse:
+    def __init__(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (600, 400), (200, 150, 140)).save(buffer, format='JPEG')
+        self.content = buffer.getvalue()
+
+    def raise_for_status(self):
+        pass
+
+
+def test_a_failed_thumbnail_fetch_is_retried(tmp_path, monkeypatch):
+    calls = []
+
+    def http_get(url, **kwargs):
+        calls.append(url)
+        if len(calls) == 1:
+            raise TimeoutError("image host timed out")
+        return ImageResponse()
+
+    monkeypatch.setattr(shop, 'THUMBNAIL_DIR', str(tmp_path))
+    monkeypatch.setattr(shop, 'thumbnail_cache', LRUCache())
+    monkeypatch.setattr(shop, 'catalog_bundle', lambda: None)
+    monkeypatch.setattr(shop, 'http_get', http_get)
+    url = "https://images.example/1.jpg"
+    assert shop.get_thumbnail(url) is None
+    thumbnail = shop.get_thumbnail(url)
+    assert Image.open(io.BytesIO(thumbnail)).size == (200, 133)
+    # Once fetched it is served from memory
+    assert shop.get_thumbnail(url) == thumbnail and len(calls) == 2
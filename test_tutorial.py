@@ -0,0 +1,167 @@
+# test_tutorial.py
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+import pytest
+import clients
+import tutorial
+from cache import LRUCache
+from stubs import StubUpstreams, tutorial_text
+from tutorial import YOUTUBE_MAX_CONCURRENCY, TutorialStreamParser, parse_tutorial
+
+
+def regex_parse_tutorial(tutorial):
+    # The one-shot parser the streaming one replaced; both must agree on every input
+    parsed = []
+    for section in re.split(r'\d+\.', tutorial)[1:]:
+        lines = section.strip().split('\n')
+        title = lines[0].strip()
+        content = '\n'.join(lines[1:])
+        search_query = None
+        search_match = re.search(r'\[YouTube Search: (.*?)\]', content)
+        if search_match:
+            search_query = search_match.group(1)
+            content = re.sub(r'\[YouTube Search: .*?\]', '', content).strip()
+        parsed.append((title, content, search_query))
+    return parsed
+
+
+def recorded_tutorial():
+    # A preamble, a false "SPF 30." header inside a section, and a last section without a search marker
+    text = tutorial_text("Medium", "Date Night")
+    text = text.replace("preparation step for Medium skin.",
+                        "preparation step for Medium skin. Finish with SPF 30. Let it set.")
+    return text + "\n\n7. Setting Spray\nMist twice from arm's length.\n"
+
+
+def stream(text, rng):
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 6)
+        yield text[position:position + size]
+        position += size
+
+
+def test_recorded_tutorial_has_the_expected_sections():
+    sections = parse_tutorial(recorded_tutorial())
+    assert sections == regex_parse_tutorial(recorded_tutorial())
+    assert sections[0] == ("Skin Preparation",
+                           "A short explanation of the skin preparation step for Medium skin. Finish with SPF", None)
+    # "30." reads as a header to both parsers; what matters is that streaming splits it the same way
+    assert sections[1] == ("Let it set.", "", "Skin Preparation tutorial Medium skin Date Night")
+    assert len(sections) == 8 and not any("Here is your tutorial" in title for title, _, _ in sections)
+    assert sections[-1] == ("Setting Spray", "Mist twice from arm's length.", None)
+
+
+def test_streamed_chunks_match_the_regex_parser():
+    text = recorded_tutorial()
+    expected = regex_parse_tutorial(text)
+    rng = random.Random(0)
+    for _ in range(200):
+        parser = TutorialStreamParser()
+        sections = []
+        for chunk in stream(text, rng):
+            sections += parser.feed(chunk)
+        sections += parser.close()
+        assert sections == expected
+        assert parser.text == text
+
+
+@pytest.fixture
+def youtube(monkeypatch):
+    # The YouTube client pointed at a local stub, with an empty video cache and fresh breakers
+    with StubUpstreams(latency=0.05) as stub:
+        for key, value in stub.env().items():
+            monkeypatch.setenv(key, value)
+        clients.get_youtube_client.clear()
+        monkeypatch.setattr(tutorial, 'video_cache', LRUCache())
+        # Pool threads build their HTTP connection again, so a patched YOUTUBE_TIMEOUT applies
+        monkeypatch.setattr(tutorial, '_local', threading.local())
+        monkeypatch.setattr(clients, '_breakers', defaultdict(clients.CircuitBreaker))
+        monkeypatch.setattr(clients, 'BACKOFF_BASE', 0.01)
+        yield stub
+    clients.get_youtube_client.clear()
+
+
+def render_tutorial(text, timeout, videos):
+    import streamlit as st
+    from tutorial import display_makeup_tutorial
+    st.session_state['result'] = display_makeup_tutorial(text, timeout=timeout, videos=videos)
+
+
+def run_tutorial(text, timeout=20, known=None, result=None):
+    # Rendered videos and errors, and the seconds taken; `result` receives what the call returned
+    from streamlit.testing.v1 import AppTest
+    started = time.perf_counter()
+    app = AppTest.from_function(render_tutorial, args=(text, timeout, known)).run(timeout=30)
+    assert not app.exception
+    if result is not None:
+        result.update(zip(("text", "videos"), app.session_state['result']))
+    videos = [element.value for element in app.markdown if element.value.startswith("**Video Tutorial:**")]
+    errors = [element.value for element in app.error]
+    return videos, errors, time.perf_counter() - started
+
+
+def queries(text):
+    return [search_query for _, _, search_query in parse_tutorial(text)]
+
+
+def test_one_failed_search_leaves_the_others(youtube):
+    text = tutorial_text()
+    failing = queries(text)[2]
+    youtube.youtube_errors[failing] = 403
+    videos, errors, _ = run_tutorial(text)
+    assert len(videos) == 5 and failing not in " ".join(videos)
+    assert len(errors) == 1 and errors[0].startswith("Error fetching YouTube video")
+    # A 403 is not retried
+    assert youtube.requests['youtube'] == 6
+
+
+def test_known_videos_and_failures_are_shown_without_searching_again(youtube):
+    text = tutorial_text()
+    failing = queries(text)[2]
+    youtube.youtube_errors[failing] = 403
+    result = {}
+    run_tutorial(text, result=result)
+    assert result["text"] == text and set(result["videos"]) == set(queries(text))
+    assert result["videos"][failing][2] is not None
+
+    # A rerun with the stored outcomes renders the same page with no searches, even for the failure
+    videos, errors, _ = run_tutorial(text, known=result["videos"])
+    assert len(videos) == 5 and len(errors) == 1
+    assert youtube.requests['youtube'] == 6
+
+
+def test_searches_run_in_parallel_up_to_the_cap(youtube):
+    text = "\n\n".join(f"{i}. Step\nSome advice.\n[YouTube Search: step {i} tutorial]" for i in range(1, 13))
+    for query in queries(text):
+        youtube.youtube_delays[query] = 0.3
+    videos, errors, elapsed = run_tutorial(text)
+    assert len(videos) == 12 and not errors
+    assert youtube.peak['youtube'] == YOUTUBE_MAX_CONCURRENCY
+    assert elapsed < 12 * 0.3
+
+
+def test_a_slow_search_times_out_on_its_own(youtube, monkeypatch):
+    monkeypatch.setattr(tutorial, 'YOUTUBE_TIMEOUT', 0.3)
+    text = tutorial_text()
+    youtube.youtube_delays[queries(text)[0]] = 5
+    videos, errors, elapsed = run_tutorial(text)
+    assert len(videos) == 5 and len(errors) == 1
+    # The first attempt and both retries each give up after the per-request timeout
+    assert elapsed < 4
+    assert youtube.requests['youtube'] == 8
+
+
+def test_searches_past_the_deadline_are_reported_as_timed_out(youtube):
+    text = tutorial_text()
+    youtube.youtube_delays[queries(text)[-1]] = 1
+    videos, errors, elapsed = run_tutorial(text, timeout=0.3)
+    assert len(videos) == 5
+    assert errors == ["Error fetching YouTube video: request timed out"]
+    assert elapsed < 1
+    # The abandoned search still holds a pool thread; let it finish before the next test
+    while youtube.active.get('youtube'):
+        time.sleep(0.05)
@@ -0,0 +1,96 @@
+# tracing.py
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# GLOSSIERE_TRACE_FILE exports every finished trace: *.jsonl gets one span per line, anything else
+# is written in Chrome trace format (open it in chrome://tracing or ui.perfetto.dev)
+TRACE_FILE = os.environ.get('GLOSSIERE_TRACE_FILE')
+
+_current = contextvars.ContextVar('trace', default=None)
+_export_lock = threading.Lock()
+
+
+class Trace:
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name, start, end, attrs):
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "start_ms": (start - self.origin) * 1000,
+                "duration_ms": (end - start) * 1000,
+                "thread": threading.current_thread().name,
+                "thread_id": threading.get_ident(),
+                "attrs": attrs,
+            })
+
+    def summary(self):
+        # Total time and call count per stage, slowest first
+        totals = {}
+        for s in self.spans:
+            total = totals.setdefault(s["name"], {"stage": s["name"], "calls": 0, "total_ms": 0.0})
+            total["calls"] += 1
+            total["total_ms"] += s["duration_ms"]
+        return sorted(totals.values(), key=lambda t: -t["total_ms"])
+
+    def chrome_events(self):
+        base_us = self.started_at * 1e6
+        return [{"name": s["name"], "ph": "X", "ts": base_us + s["start_ms"] * 1000, "dur": s["duration_ms"] * 1000,
+                 "pid": os.getpid(), "tid": s["thread_id"], "args": dict(s["attrs"], thread=s["thread"])}
+                for s in self.spans]
+
+    def export(self, path):
+        with _export_lock:
+            if path.endswith('.jsonl'):
+                with open(path, 'a') as f:
+                    for s in self.spans:
+                        f.write(json.dumps(dict(s, trace=self.name, trace_start=self.started_at), default=str) + '\n')
+            else:
+                # Chrome's JSON array format allows a missing closing bracket, so traces can be appended
+                new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+                with open(path, 'a') as f:
+                    if new_file:
+                        f.write('[\n')
+                    for event in self.chrome_events():
+                        f.write(json.dumps(event, default=str) + ',\n')
+
+
+def start_trace(name):
+    trace = Trace(name)
+    _current.set(trace)
+    return trace
+
+
+def finish_trace(trace):
+    if _current.get() is trace:
+        _current.set(None)
+    if TRACE_FILE:
+        trace.export(TRACE_FILE)
+    return trace
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def span(name, **attrs):
+    # A no-op unless a trace is active in this context
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, start, time.perf_counter(), attrs)
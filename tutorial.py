@@ -1,14 +1,35 @@
-
-import os
+import argparse
+import contextvars
+import itertools
 import re
-from openai import OpenAI
-from googleapiclient.discovery import build
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
 import streamlit as st
+from cache import TieredCache, cache_key
+from clients import call_endpoint, coalesce, get_openai_client, get_youtube_client
+from tracing import span
 
-client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
-youtube = build('youtube', 'v3', developerKey=os.environ.get('YOUTUBE_API_KEY'))
+YOUTUBE_TIMEOUT = 10
+YOUTUBE_MAX_CONCURRENCY = 6
+TUTORIAL_MODEL = "gpt-3.5-turbo"
 
-def generate_makeup_tutorial(skin_tone, skin_condition, occasion):
+# The Tutorials tab's selectbox options: 7 x 5 x 4 = 140 possible tutorials
+SKIN_TONES = ["Very Light", "Light", "Light Medium", "Medium", "Medium Deep", "Deep", "Very Deep"]
+SKIN_CONDITIONS = ["Normal", "Dry", "Oily", "Combination", "Sensitive"]
+OCCASIONS = ["Everyday", "Work", "Date Night", "Special Event"]
+
+tutorial_cache = TieredCache("tutorials", maxsize=256, ttl=30 * 24 * 3600, max_entries=1000)
+video_cache = TieredCache("youtube_videos", maxsize=1024, ttl=7 * 24 * 3600, max_entries=5000)
+SECTION_HEADER = re.compile(r'\d+\.')
+SEARCH_MARKER = re.compile(r'\[YouTube Search: (.*?)\]')
+
+# Shared by every session, so this also caps concurrent YouTube searches process-wide
+_youtube_pool = ThreadPoolExecutor(max_workers=YOUTUBE_MAX_CONCURRENCY, thread_name_prefix="youtube")
+_local = threading.local()
+
+
+def tutorial_messages(skin_tone, skin_condition, occasion):
     prompt = f"""
     Generate a detailed makeup tutorial for someone with the following characteristics:
     - Skin tone: {skin_tone}
@@ -28,59 +49,231 @@ def generate_makeup_tutorial(skin_tone, skin_condition, occasion):
 
     Ensure that each search query is specific to the step, skin tone, and occasion.
     """
+    return [
+        {"role": "system", "content": "You are a professional makeup artist providing tailored tutorials."},
+        {"role": "user", "content": prompt}
+    ]
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a professional makeup artist providing tailored tutorials."},
-            {"role": "user", "content": prompt}
-        ]
-    )
+
+def generate_makeup_tutorial(skin_tone, skin_condition, occasion):
+    response = call_endpoint("openai.chat", lambda: get_openai_client().chat.completions.create(
+        model=TUTORIAL_MODEL,
+        messages=tutorial_messages(skin_tone, skin_condition, occasion)
+    ))
 
     return response.choices[0].message.content
 
-def get_youtube_video(query):
-    try:
-        search_response = youtube.search().list(
-            q=query,
-            type='video',
-            part='id,snippet',
-            maxResults=1
-        ).execute()
-
-        if 'items' in search_response and search_response['items']:
-            video_id = search_response['items'][0]['id']['videoId']
-            video_title = search_response['items'][0]['snippet']['title']
-            embed_html = f'<iframe width="560" height="315" src="https://www.youtube.com/embed/{video_id}" frameborder="0" allowfullscreen></iframe>'
-            return video_title, embed_html
-        else:
-            return None, None
 
+def stream_makeup_tutorial(skin_tone, skin_condition, occasion):
+    # Yields the completion text piece by piece as the model produces it
+    with span("openai.tutorial_first_token"):
+        stream = call_endpoint("openai.chat", lambda: get_openai_client().chat.completions.create(
+            model=TUTORIAL_MODEL,
+            messages=tutorial_messages(skin_tone, skin_condition, occasion),
+            stream=True
+        ))
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def parse_section(section):
+    lines = section.strip().split('\n')
+    title = lines[0].strip()
+    content = '\n'.join(lines[1:])
+
+    search_query = None
+    search_match = SEARCH_MARKER.search(content)
+    if search_match:
+        search_query = search_match.group(1)
+        content = SEARCH_MARKER.sub('', content).strip()
+    return title, content, search_query
+
+
+class TutorialStreamParser:
+    # A section is complete once the next numbered header has arrived; close() flushes the last one
+    def __init__(self):
+        self.text = ''
+        self.pending = ''
+
+    def feed(self, chunk):
+        self.text += chunk
+        self.pending += chunk
+        headers = list(SECTION_HEADER.finditer(self.pending))
+        if len(headers) < 2:
+            return []
+        complete, self.pending = self.pending[:headers[-1].start()], self.pending[headers[-1].start():]
+        # The first piece is the preamble before header 1, or empty once we are past it
+        return [parse_section(section) for section in SECTION_HEADER.split(complete)[1:]]
+
+    def close(self):
+        remaining, self.pending = self.pending, ''
+        return [parse_section(section) for section in SECTION_HEADER.split(remaining)[1:]]
+
+
+def parse_tutorial(tutorial):
+    parser = TutorialStreamParser()
+    return parser.feed(tutorial) + parser.close()
+
+
+def _thread_http():
+    # httplib2 connections aren't thread-safe, so every pool thread gets its own
+    if not hasattr(_local, 'http'):
+        import httplib2
+        _local.http = httplib2.Http(timeout=YOUTUBE_TIMEOUT)
+    return _local.http
+
+
+def search_youtube_video(query):
+    cached = video_cache.get(query)
+    if cached is not None:
+        return tuple(cached)
+
+    request = get_youtube_client().search().list(
+        q=query,
+        type='video',
+        part='id,snippet',
+        maxResults=1
+    )
+    with span("youtube.search", query=query):
+        search_response = coalesce(('youtube.search', query),
+                                   lambda: call_endpoint("youtube.search", lambda: request.execute(http=_thread_http())))
+
+    video_title, embed_html = None, None
+    if 'items' in search_response and search_response['items']:
+        video_id = search_response['items'][0]['id']['videoId']
+        video_title = search_response['items'][0]['snippet']['title']
+        embed_html = f'<iframe width="560" height="315" src="https://www.youtube.com/embed/{video_id}" frameborder="0" allowfullscreen></iframe>'
+    video_cache.set(query, [video_title, embed_html])
+    return video_title, embed_html
+
+
+def video_result(future):
+    # (title, embed html, error message) for a finished search; failures are kept like results
+    try:
+        video_title, embed_html = future.result(timeout=0)
     except Exception as e:
-        st.error(f"Error fetching YouTube video: {str(e)}")
-        return None, None
-
-def display_makeup_tutorial(tutorial):
-    sections = re.split(r'\d+\.', tutorial)[1:]  # Skip the first empty split
-    for section in sections:
-        lines = section.strip().split('\n')
-        title = lines[0].strip()
-        content = '\n'.join(lines[1:])
-
-        st.markdown(f"### {title}")
-
-        search_match = re.search(r'\[YouTube Search: (.*?)\]', content)
-        if search_match:
-            search_query = search_match.group(1)
-            content = re.sub(r'\[YouTube Search: .*?\]', '', content).strip()
-
-            st.write(content)
-
-            video_title, embed_html = get_youtube_video(search_query)
-            if video_title and embed_html:
-                st.write(f"**Video Tutorial:** {video_title}")
-                st.markdown(embed_html, unsafe_allow_html=True)
-            else:
-                st.write("No relevant video found for this step.")
+        return None, None, str(e) or 'request timed out'
+    return video_title, embed_html, None
+
+
+def render_video(slot, video):
+    video_title, embed_html, error = video
+    with slot.container():
+        if error:
+            st.error(f"Error fetching YouTube video: {error}")
+        elif video_title and embed_html:
+            st.write(f"**Video Tutorial:** {video_title}")
+            st.markdown(embed_html, unsafe_allow_html=True)
         else:
-            st.write(content)
+            st.write("No relevant video found for this step.")
+
+
+def render_finished(searches, videos):
+    for future in [future for future in searches if future.done()]:
+        slot, search_query = searches.pop(future)
+        videos[search_query] = video_result(future)
+        render_video(slot, videos[search_query])
+
+
+def display_makeup_tutorial(tutorial, timeout=YOUTUBE_TIMEOUT * 2, videos=None):
+    # `tutorial` is the full text or an iterable of streamed chunks. Each section is rendered and its
+    # video search started as soon as the section is complete; videos fill in as searches finish.
+    # `videos` holds the outcome of earlier searches by query, which are shown without searching again.
+    # Returns the text and every search's outcome, failures included.
+    chunks = [tutorial] if isinstance(tutorial, str) else tutorial
+    videos = dict(videos or {})
+    parser = TutorialStreamParser()
+    searches = {}
+    typing = st.empty()
+    last_update = 0
+
+    def render_sections(sections):
+        nonlocal typing
+        for title, content, search_query in sections:
+            with typing.container():
+                st.markdown(f"### {title}")
+                st.write(content)
+            if search_query:
+                slot = st.empty()
+                if search_query in videos:
+                    render_video(slot, videos[search_query])
+                else:
+                    slot.caption("Finding a video tutorial...")
+                    # Run in a copy of this context so the search's span lands in the current trace
+                    future = _youtube_pool.submit(contextvars.copy_context().run, search_youtube_video, search_query)
+                    searches[future] = slot, search_query
+            typing = st.empty()
+
+    for chunk in chunks:
+        render_sections(parser.feed(chunk))
+        render_finished(searches, videos)
+        if time.monotonic() - last_update > 0.1:
+            # Show the section being written, throttled so every token isn't a separate UI update
+            typing.markdown(parser.pending + " ▌")
+            last_update = time.monotonic()
+    render_sections(parser.close())
+    typing.empty()
+
+    try:
+        for future in as_completed(list(searches), timeout=timeout):
+            slot, search_query = searches.pop(future)
+            videos[search_query] = video_result(future)
+            render_video(slot, videos[search_query])
+    except TimeoutError:
+        for future, (slot, search_query) in searches.items():
+            future.cancel()
+            videos[search_query] = None, None, 'request timed out'
+            render_video(slot, videos[search_query])
+    return parser.text, videos
+
+
+def tutorial_key(skin_tone, skin_condition, occasion):
+    return cache_key(skin_tone=skin_tone, skin_condition=skin_condition, occasion=occasion, model=TUTORIAL_MODEL)
+
+
+def show_makeup_tutorial(skin_tone, skin_condition, occasion):
+    # A cached tutorial renders immediately; otherwise it is streamed and stored once complete.
+    # Returns the text and its videos, as display_makeup_tutorial does
+    key = tutorial_key(skin_tone, skin_condition, occasion)
+    cached = tutorial_cache.get(key)
+    if cached is not None:
+        with span("tutorial.render", cached=True):
+            return display_makeup_tutorial(cached)
+
+    with span("tutorial.render", cached=False):
+        tutorial, videos = display_makeup_tutorial(stream_makeup_tutorial(skin_tone, skin_condition, occasion))
+    if parse_tutorial(tutorial):
+        tutorial_cache.set(key, tutorial)
+    return tutorial, videos
+
+
+def precompute_tutorials(workers=4, refresh=False):
+    # Fill the cache for every selectbox combination, including each section's video
+    def build(combination):
+        key = tutorial_key(*combination)
+        tutorial = None if refresh else tutorial_cache.get(key)
+        if tutorial is None:
+            tutorial = generate_makeup_tutorial(*combination)
+            tutorial_cache.set(key, tutorial)
+        for _, _, search_query in parse_tutorial(tutorial):
+            if search_query:
+                search_youtube_video(search_query)
+        return combination
+
+    combinations = list(itertools.product(SKIN_TONES, SKIN_CONDITIONS, OCCASIONS))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(build, combination) for combination in combinations]
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                print(f"[{done}/{len(combinations)}] {' / '.join(future.result())}")
+            except Exception as e:
+                print(f"[{done}/{len(combinations)}] failed: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute cached tutorials for every input combination")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--refresh", action="store_true", help="regenerate tutorials that are already cached")
+    args = parser.parse_args()
+    precompute_tutorials(args.workers, args.refresh)